@@ -5,13 +5,19 @@ I/O処理は HfStorage、デルタ管理は DeltaManager、複雑な名寄せは
 """
 
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 
 import pandas as pd
 from loguru import logger
 
 from data_engine.core.config import CONFIG
-from data_engine.core.models import EdinetCodeRecord
+from data_engine.core.models import (
+    CatalogRecord,
+    CatalogRecordList,
+    EdinetCodeRecord,
+    StockMasterRecord,
+    StockMasterRecordList,
+)
 from data_engine.engines.edinet_engine import EdinetEngine
 from data_engine.engines.fsa_engine import FsaEngine
 from data_engine.engines.market_engine import MarketDataEngine
@@ -20,6 +26,20 @@ from data_engine.engines.reconciliation_engine import ReconciliationEngine
 from data_engine.storage.delta_manager import DeltaManager
 from data_engine.storage.hf_storage import HfStorage
 
+# 値の種類が少ない文字列列は category 型で保持する (メモリ削減・比較の高速化)
+# processed_status は loc による新しい値の代入があるため対象外とする
+CATEGORICAL_COLUMNS = {
+    "catalog": ["doc_type", "source"],
+    "master": ["market", "sector_jpx_33", "sector_jpx_17", "size_category"],
+}
+
+# キーごとの検証用 TypeAdapter と出力列順 (モデル定義順)。モデルの走査はロード時に一度だけ行う
+RECORD_ADAPTERS = {"catalog": CatalogRecordList, "master": StockMasterRecordList}
+RECORD_COLUMNS = {
+    "catalog": tuple(CatalogRecord.model_fields),
+    "master": tuple(StockMasterRecord.model_fields),
+}
+
 
 class CatalogManager:
     def __init__(
@@ -184,33 +204,36 @@ class CatalogManager:
         if df is None or df.empty:
             return df
 
+        adapter = RECORD_ADAPTERS.get(key)
+        if adapter is None:
+            # 未知のキー（financial_values 等）はバリデーションせずそのまま返す
+            return df
+
         try:
             if key == "catalog":
-                from data_engine.core.models import CatalogRecord
-
                 df["is_amendment"] = df["is_amendment"].astype(bool) if "is_amendment" in df.columns else False
-                records = []
-                for _, row in df.iterrows():
-                    d = {k: (v if pd.notna(v) else None) for k, v in row.to_dict().items()}
-                    records.append(CatalogRecord(**d).model_dump())
-                return pd.DataFrame(records)
-
-            elif key == "master":
-                from data_engine.core.models import StockMasterRecord
-
-                records = []
-                for _, row in df.iterrows():
-                    d = {k: (v if pd.notna(v) else None) for k, v in row.to_dict().items()}
-                    records.append(StockMasterRecord(**d).model_dump())
-                return pd.DataFrame(records)
-            else:
-                # 未知のキー（financial_values 等）はバリデーションせずそのまま返す
-                return df
+            records = df.astype(object).where(df.notna(), None).to_dict("records")
+            validated = adapter.validate_python(records)
+            cleaned = self._records_to_frame(key, adapter.dump_python(validated))
+            return self._to_categorical(key, cleaned)
         except Exception as e:
             logger.warning(f"データクレンジングエラー ({key}): {e} - フォールバックとして元のDFを返します。")
 
         return df
 
+    @staticmethod
+    def _records_to_frame(key: str, records: List[Dict]) -> pd.DataFrame:
+        """検証済みレコードを RECORD_COLUMNS の列順で列単位に DataFrame 化し、行ごとの型推論を避ける"""
+        return pd.DataFrame({col: [r[col] for r in records] for col in RECORD_COLUMNS[key]})
+
+    @staticmethod
+    def _to_categorical(key: str, df: pd.DataFrame) -> pd.DataFrame:
+        """CATEGORICAL_COLUMNS に定義された列を category 型へ変換する"""
+        cols = [c for c in CATEGORICAL_COLUMNS.get(key, []) if c in df.columns]
+        if cols:
+            df[cols] = df[cols].astype("category")
+        return df
+
     def _retrospective_cleanse(self):
         logger.info("データ構造の健全性確認を開始します (Retrospective Cleanse)...")
         updates_needed = False
@@ -297,11 +320,16 @@ class CatalogManager:
         """書類の現在の処理ステータスを取得する (O(1) ルックアップ)。"""
         return self._status_cache.get(doc_id, "unknown")
 
-    def update_catalog(self, new_records: List[Dict]):
-        if not new_records:
-            return
-
-        df_new = pd.DataFrame(new_records)
+    def update_catalog(self, new_records: Union[List[Dict], pd.DataFrame]):
+        # DataFrame はそのまま受け付け、レコード辞書への往復変換を省く
+        if isinstance(new_records, pd.DataFrame):
+            if new_records.empty:
+                return
+            df_new = new_records.copy()
+        else:
+            if not new_records:
+                return
+            df_new = pd.DataFrame(new_records)
         df_new = self._clean_dataframe("catalog", df_new)
 
         if self.catalog_df.empty:
@@ -367,18 +395,26 @@ class CatalogManager:
                 logger.info("書類の提出を検知し、マスタの last_submitted_at を更新しました。")
 
         # 【工学的主権】更新された銘柄の社名変更履歴を再構成
-        unique_codes = df_new["code"].unique()
-        for code in unique_codes:
-            if not code or pd.isna(code):
-                continue
-            history_df = self.reconciliation.reconstruct_name_history(code)
+        unique_codes = df_new["code"].dropna()
+        unique_codes = unique_codes[unique_codes.astype(str) != ""].unique()
+        if len(unique_codes) > 0:
+            history_df = self.reconciliation.reconstruct_name_histories(unique_codes)
             if not history_df.empty:
                 self.update_name_history(history_df)
 
     def update_listing_history(self, new_events: pd.DataFrame):
+        keys = ["code", "type", "event_date"]
         hist_df = self.hf.load_parquet("listing")
+        new_events = new_events.drop_duplicates(subset=keys)
+        if not hist_df.empty:
+            # 既存履歴 (重複排除済み) に無いイベントだけを残す。全件を結合して重複判定し直すのではなく、
+            # 新規分のキーを既存キーの索引と突き合わせる
+            known = pd.MultiIndex.from_frame(hist_df[keys])
+            new_events = new_events[~pd.MultiIndex.from_frame(new_events[keys]).isin(known)]
+        if new_events.empty:
+            return
+
         m_df = pd.concat([hist_df, new_events], ignore_index=True)
-        m_df.drop_duplicates(subset=["code", "type", "event_date"], keep="last", inplace=True)
         m_df.sort_values(["event_date", "code"], ascending=[False, True], inplace=False)
         self.hf.save_and_upload("listing", m_df, defer=True)
 
@@ -56,6 +56,14 @@ class AriaConfig:
         # 5. 並列実行設定
         self.PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", 2))
         self.BATCH_PARALLEL_SIZE = 8
+        # Bin 単位のデルタ書き込み並列数 (Bin ごとに別ファイルのため競合しない)
+        self.BIN_WRITE_WORKERS = int(os.getenv("BIN_WRITE_WORKERS", 8))
+        # ZIP 展開のスレッド数 (parse_worker のプロセスごと)。PARALLEL_WORKERS 個のプロセスで同時に動くため、
+        # 既定値は CPU 数をプロセス数で割った値 (上限 4) とし、合計スレッド数が CPU 数を超えないようにする
+        default_extract = max(1, min(4, (os.cpu_count() or 1) // max(1, self.PARALLEL_WORKERS)))
+        self.EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", default_extract))
+        # 指数処理の並列数 (指数ごとの取得・差分生成を I/O 待ちの間に重ねる)
+        self.INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", 4))
 
         # 6. 機密情報 (環境変数)
         self.EDINET_API_KEY = os.getenv("EDINET_API_KEY")
@@ -1,8 +1,8 @@
 import math
-from typing import Any, Optional, Union, get_args, get_origin
+from typing import Any, List, Optional, Union, get_args, get_origin
 
 import pyarrow as pa
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 
 from data_engine.core.utils import normalize_code
 
@@ -10,6 +10,8 @@ from data_engine.core.utils import normalize_code
 class EdinetDocument(BaseModel):
     """EDINET APIから取得される書類メタデータのバリデーションモデル (API v2 全フィールド網羅)"""
 
+    model_config = ConfigDict(frozen=True)
+
     seqNumber: int
     docID: str
     edinetCode: Optional[str] = None
@@ -51,6 +53,8 @@ class EdinetDocument(BaseModel):
 class EdinetCodeRecord(BaseModel):
     """金融庁公表のEDINETコードリストレコード (13項目 + 英語版補完情報)"""
 
+    model_config = ConfigDict(frozen=True)
+
     edinet_code: str
     submitter_type: Optional[str] = None  # 提出者種別
     is_listed_edinet: Optional[str] = None  # 上場区分 (上場/非上場)
@@ -108,6 +112,8 @@ class EdinetCodeRecord(BaseModel):
 class CatalogRecord(BaseModel):
     """統合ドキュメントカタログ (documents_index.parquet) のレコードモデル (39カラム構成)"""
 
+    model_config = ConfigDict(frozen=True)
+
     # 1. Identifiers (識別子・基本情報)
     doc_id: str
     bin_id: Optional[str] = None  # 物理パーティションID (分析用 Bin 分割キー)
@@ -216,7 +222,7 @@ class StockMasterRecord(BaseModel):
     識別子、属性、業界、状態の論理的順序で構成。ウェブアプリでの利用を最適化。
     """
 
-    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+    model_config = ConfigDict(extra="ignore", populate_by_name=True, frozen=True)
 
     # --- 1. Essential Web Identity (Primary Keys) ---
     identity_key: str = Field(..., description="ARIA ユニーク識別子 (EDINET_CODE or CODE or JCN)")
@@ -328,6 +334,8 @@ class StockMasterRecord(BaseModel):
 class ListingEvent(BaseModel):
     """上場・廃止イベントの記録モデル"""
 
+    model_config = ConfigDict(frozen=True)
+
     code: str
     type: str  # LISTING, DELISTING
     event_date: str
@@ -343,6 +351,8 @@ class ListingEvent(BaseModel):
 class NameEvent(BaseModel):
     """社名変更の記録モデル (漢字のみの追跡)"""
 
+    model_config = ConfigDict(frozen=True)
+
     code: str
     old_name: str
     new_name: str
@@ -359,6 +369,8 @@ class NameEvent(BaseModel):
 class JpxDefinitionRecord(BaseModel):
     """JPX 業種・規模区分名等の定義マスタレコードモデル (Web API 正規化用)"""
 
+    model_config = ConfigDict(frozen=True)
+
     type: str = Field(..., description="区分種別 (sector_33, sector_17, size)")
     code: str = Field(..., description="区分コード")
     name: str = Field(..., description="区分名称 (和文)")
@@ -369,6 +381,8 @@ class JpxDefinitionRecord(BaseModel):
 class IndexEvent(BaseModel):
     """指数構成銘柄の変更イベント記録モデル"""
 
+    model_config = ConfigDict(frozen=True)
+
     date: str
     index_name: str
     code: str
@@ -387,6 +401,8 @@ class IndexEvent(BaseModel):
 class FinancialValueRecord(BaseModel):
     """財務数値データ (financial_values) のレコードモデル"""
 
+    model_config = ConfigDict(frozen=True)
+
     # 1. Identity (誰のデータか)
     docid: str
     # 2. Core Data (何の値か)
@@ -425,6 +441,8 @@ class FinancialValueRecord(BaseModel):
 class QualitativeTextRecord(BaseModel):
     """定性情報テキスト (qualitative_text) のレコードモデル"""
 
+    model_config = ConfigDict(frozen=True)
+
     # 1. Identity (誰のデータか)
     docid: str
     # 2. Core Data (何の値か)
@@ -531,3 +549,9 @@ ARIA_SCHEMAS = {
     "financial_values": SCHEMA_FINANCIAL,
     "qualitative_text": SCHEMA_TEXT,
 }
+
+# --- バッチ検証用 TypeAdapter (モジュールロード時に1回だけ構築) ---
+# レコードのリストを pydantic-core で一括検証する (1件ずつのモデル生成を避ける)
+EdinetDocumentList = TypeAdapter(List[EdinetDocument])
+CatalogRecordList = TypeAdapter(List[CatalogRecord])
+StockMasterRecordList = TypeAdapter(List[StockMasterRecord])
@@ -1,57 +1,122 @@
+import sys
+from functools import lru_cache
+
 import requests
+from loguru import logger
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    import huggingface_hub.utils._http as _hf_http
+except ImportError:
+    _hf_http = None
+
+# 【極限強化】HF Hubの大規模コミット(300操作超)はサーバー側処理が重いため、Read Timeoutを300秒へ大幅延長
+# (connect_timeout, read_timeout)
+DEFAULT_TIMEOUT = (30, 300)
+
+# リトライ対象 (HF側の500 Internal Server Error も明示的に含める)
+RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+# リトライを許可するメソッド (大規模コミット用の PUT、HF メタデータ取得の HEAD を含む)
+RETRY_ALLOWED_METHODS = frozenset(["GET", "HEAD", "POST", "PUT", "DELETE"])
+# 指数バックオフの上限秒数 (テールレイテンシの抑制)
+RETRY_BACKOFF_MAX = 30
+
+# urllib3 コネクションプール (ホスト数 / ホストごとの接続数)
+DEFAULT_POOL_CONNECTIONS = 32
+DEFAULT_POOL_MAXSIZE = 128
+
+# 通信を堅牢化する外部ライブラリ (parsing/edinet) のモジュール
+MODULES_TO_PATCH = (
+    "data_engine.engines.parsing.edinet.edinet_api",
+    "data_engine.engines.parsing.edinet.link_base_file_analyzer",
+    "data_engine.engines.parsing.edinet.fs_tbl",
+)
+
+# パッチ適用済みのモジュール (patch_all_networking の冪等性確保用)
+_PATCHED_MODULES = set()
+
+# 引数未指定を表す番兵 (None を明示的に渡すケースと区別する)
+_UNSET = object()
+
+
+class RobustSession(requests.Session):
+    """既定タイムアウトの付与と httpx 互換引数の変換を行う Session"""
+
+    def __init__(self, timeout: tuple = DEFAULT_TIMEOUT):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        # httpx 互換の引数を requests 互換に変換 (辞書の参照を pop 1 回に集約)
+        follow_redirects = kwargs.pop("follow_redirects", _UNSET)
+        if follow_redirects is not _UNSET:
+            kwargs["allow_redirects"] = follow_redirects
+
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+class SharedRobustSession(RobustSession):
+    """
+    requests.Session() の差し替え先として共有される Session。
+    呼び出し側の with 文や close() で共有コネクションプールが閉じられないよう、close を無効化する。
+    """
+
+    def close(self):
+        pass
+
 
+@lru_cache(maxsize=8)
 def get_robust_session(
-    retries: int = 5, backoff_factor: float = 2.0, status_forcelist: list = None, timeout: tuple = (20, 60)
+    retries: int = 5,
+    backoff_factor: float = 2.0,
+    status_forcelist: tuple = RETRY_STATUS_FORCELIST,
+    timeout: tuple = DEFAULT_TIMEOUT,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    session_cls: type = RobustSession,
 ) -> requests.Session:
     """
     リトライロジックを組み込んだ堅牢な Session オブジェクトを返す。
+    同一引数での呼び出しには同じインスタンスを返し、コネクションプールを共有する。
 
     Args:
         retries (int): 最大リトライ回数
         backoff_factor (float): 指数バックオフの係数
-        status_forcelist (list): リトライ対象のHTTPステータスコード
+        status_forcelist (tuple): リトライ対象のHTTPステータスコード
         timeout (tuple): (connect_timeout, read_timeout) デフォルト値
+        pool_maxsize (int): ホストごとに保持する Keep-Alive 接続の上限
+        session_cls (type): 生成する Session クラス (RobustSession またはそのサブクラス)
 
     Returns:
         requests.Session: 設定済みのセッション
     """
     if status_forcelist is None:
-        # HF側の500(Internal Server Error)もリトライ対象として明示的に強化
-        status_forcelist = [429, 500, 502, 503, 504]
+        status_forcelist = RETRY_STATUS_FORCELIST
 
-    session = requests.Session()
+    session = session_cls(timeout=timeout)
 
+    # 429/503 の Retry-After を尊重し、それ以外は上限付きの指数バックオフで待機
     retry_strategy = Retry(
         total=retries,
-        backoff_factor=backoff_factor,  # 2.0 (2, 4, 8, 16, 32s...)
+        backoff_factor=backoff_factor,  # 2.0 (2, 4, 8, 16, 30s...)
+        backoff_max=RETRY_BACKOFF_MAX,
         status_forcelist=status_forcelist,
-        allowed_methods=["GET", "POST", "PUT"],  # 大規模コミット用のPUTも含める
+        allowed_methods=RETRY_ALLOWED_METHODS,
+        respect_retry_after_header=True,
         raise_on_status=False,
     )
 
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    # 並列ワーカーからの同一ホスト宛て通信で接続が枯渇しないよう、プールを拡張 (溢れた分はブロックせず新規接続)
+    adapter = HTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        pool_block=False,
+    )
     session.mount("https://", adapter)
     session.mount("http://", adapter)
 
-    # 【極限強化】HF Hubの大規模コミット(300操作超)はサーバー側処理が重いため、Read Timeoutを180秒へ大幅延長
-    original_request = session.request
-
-    def robust_request(method, url, **kwargs):
-        # httpx 互換の引数を requests 互換に変換
-        if "follow_redirects" in kwargs:
-            kwargs["allow_redirects"] = kwargs.pop("follow_redirects")
-
-        if "timeout" not in kwargs:
-            # (connect_timeout, read_timeout)
-            # 【究極強化】HF Hubの大規模コミット(300操作超)はサーバー側処理が重いため、Read Timeoutを300秒へ大幅延長
-            kwargs["timeout"] = (30, 300)
-        return original_request(method, url, **kwargs)
-
-    session.request = robust_request
-
     return session
 
 
@@ -65,63 +130,41 @@ def patch_all_networking():
     urllib3ベースのリトライ戦略を備えたセッションを強制注入する。
     これこそが世界最高水準の安定性を実現する唯一の方法である。
     """
-    from loguru import logger
+    # 全モジュールへ適用済みであれば何もしない (テスト等での再呼び出し対策)
+    if _PATCHED_MODULES.issuperset(MODULES_TO_PATCH):
+        return
 
     robust_session = GLOBAL_ROBUST_SESSION
+    # parsing/edinet 向けの共有セッション (with 文や close() で閉じられない)
+    shared_session = get_robust_session(session_cls=SharedRobustSession)
 
     # 1. HuggingFace Hub の通信を堅牢化
-    try:
-        import huggingface_hub.utils._http as hf_http
-
+    if _hf_http is not None:
         # 内部的な get_session を差し替える
-        hf_http.get_session = lambda: robust_session
+        _hf_http.get_session = lambda: robust_session
         logger.info("HF Hub communication has been robustified.")
-    except ImportError:
-        pass
 
     # 2. 外部ライブラリ parsing/edinet の通信を堅牢化
-    modules_to_patch = []
-    modules_to_patch.extend(
-        [
-            "data_engine.engines.parsing.edinet.edinet_api",
-            "data_engine.engines.parsing.edinet.link_base_file_analyzer",
-            "data_engine.engines.parsing.edinet.fs_tbl",
-        ]
-    )
-
-    for mod_name in modules_to_patch:
+    for mod_name in MODULES_TO_PATCH:
+        if mod_name in _PATCHED_MODULES:
+            continue
         try:
-            import sys
-
             if mod_name in sys.modules:
                 mod = sys.modules[mod_name]
                 if hasattr(mod, "requests"):
-                    # Session クラス自体を差し替えて、インスタンス化時にアダプタ等が適用されるようにする
-                    # (edinet_engine.py での実装と同様の考え方)
-                    class RobustSessionAdapter:
-                        def __init__(self, *args, **kwargs):
-                            self._session = robust_session
-
-                        def __getattr__(self, name):
-                            return getattr(self._session, name)
-
-                        def __enter__(self):
-                            return self._session
-
-                        def __exit__(self, *args):
-                            pass
-
-                    mod.requests.Session = RobustSessionAdapter
+                    # Session() の呼び出しで共有セッションそのものを返す (属性アクセスの委譲を挟まない)
+                    mod.requests.Session = lambda *args, **kwargs: shared_session
 
                     # 3. トップレベル関数の差し替え (直接呼び出し対策)
-                    mod.requests.get = robust_session.get
-                    mod.requests.post = robust_session.post
-                    mod.requests.put = robust_session.put
-                    mod.requests.delete = robust_session.delete
-                    mod.requests.patch = robust_session.patch
-                    mod.requests.head = robust_session.head
-                    mod.requests.request = robust_session.request
-
+                    mod.requests.get = shared_session.get
+                    mod.requests.post = shared_session.post
+                    mod.requests.put = shared_session.put
+                    mod.requests.delete = shared_session.delete
+                    mod.requests.patch = shared_session.patch
+                    mod.requests.head = shared_session.head
+                    mod.requests.request = shared_session.request
+
+                    _PATCHED_MODULES.add(mod_name)
                     logger.debug(f"Patched all networking entry points in {mod_name}")
         except Exception as e:
             logger.debug(f"Failed to patch {mod_name}: {e}")
@@ -1,8 +1,12 @@
+import re
 from datetime import datetime
 from typing import Optional
 
 import pandas as pd
 
+# EDINET 日時表記 (YYYY-MM-DD[ HH:MM[:SS]]) の解析パターン
+_DT_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?")
+
 
 def normalize_code(code, nationality: str = None) -> Optional[str]:
     """
@@ -43,6 +47,32 @@ def normalize_code(code, nationality: str = None) -> Optional[str]:
     return c or None
 
 
+def normalize_codes(codes: pd.Series, nationality: str = None) -> pd.Series:
+    """
+    normalize_code の一括版。列全体を文字列演算でまとめて正規化する。
+    正規化できない値 (欠損・空文字列・"None"・"nan") は None とする。
+    """
+    if codes.empty:
+        return codes.astype(object)
+
+    c = codes.where(codes.notna(), "").astype(str).str.strip()
+    invalid = (c == "") | c.str.lower().isin(["none", "nan"])
+
+    # プレフィックス (例: "JP:") の分離
+    parts = c.str.partition(":")
+    has_prefix = parts[1] == ":"
+    default_nat = nationality.upper() if nationality else ""
+    nat = parts[0].str.upper().where(has_prefix, default_nat)
+    core = parts[2].str.strip().where(has_prefix, c)
+
+    # Excel/Float 由来の ".0" を除去し、日本株 (JP) は 4 桁を 5 桁化
+    core = core.mask(core.str.endswith(".0"), core.str[:-2])
+    core = core.mask((nat == "JP") & (core.str.len() == 4), core + "0")
+
+    result = (nat + ":" + core).where((nat != "") & (core != ""), core).astype(object)
+    return result.where(~invalid & (result != ""), None)
+
+
 def get_edinet_repo_path(doc_id: str, submit_at: str, suffix: str = "zip") -> str:
     """
     EDINET書類のリポジトリ内パスを生成する (Partitioned Structure)
@@ -64,12 +94,28 @@ def get_edinet_repo_path(doc_id: str, submit_at: str, suffix: str = "zip") -> st
 
 
 def parse_datetime(dt_str: str):
-    """EDINET の submitDateTime (YYYY-MM-DD HH:MM[:SS]) を堅牢にパースする"""
+    """EDINET の submitDateTime (YYYY-MM-DD[ HH:MM[:SS]]) を堅牢にパースする"""
     if not dt_str or not isinstance(dt_str, str):
         return None
+    # strptime の書式解釈を毎回行わず、事前コンパイル済み正規表現で数値を切り出す
+    m = _DT_RE.fullmatch(dt_str)
+    if not m:
+        return None
     try:
-        if len(dt_str) > 16:
-            return datetime.strptime(dt_str[:19], "%Y-%m-%d %H:%M:%S")
-        return datetime.strptime(dt_str[:16], "%Y-%m-%d %H:%M")
-    except Exception:
+        return datetime(int(m[1]), int(m[2]), int(m[3]), int(m[4] or 0), int(m[5] or 0), int(m[6] or 0))
+    except ValueError:
         return None
+
+
+def parse_datetime_series(s: pd.Series) -> pd.Series:
+    """parse_datetime の一括版。パース不能な値は NaT とする"""
+    return pd.to_datetime(s, format="ISO8601", errors="coerce", cache=True)
+
+
+def edinet_partitions(submit_at: pd.Series) -> pd.Series:
+    """
+    submitDateTime の列から RAW 保存先のパーティション (year=YYYY/month=MM/day=DD) を一括生成する。
+    パース不能な値は None とする。
+    """
+    dt = parse_datetime_series(submit_at)
+    return dt.dt.strftime("year=%Y/month=%m/day=%d").astype(object).where(dt.notna(), None)
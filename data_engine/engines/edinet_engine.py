@@ -2,8 +2,9 @@ from pathlib import Path
 from typing import Dict, List
 
 from loguru import logger
+from pydantic import ValidationError
 
-from data_engine.core.models import EdinetDocument
+from data_engine.core.models import EdinetDocument, EdinetDocumentList
 
 # 内部モジュール（外部ライブラリ）のインポート
 from data_engine.engines.parsing.edinet.edinet_api import (
@@ -58,14 +59,20 @@ class EdinetEngine:
             return []
 
         records = df.to_dict("records")
-        validated_records = []
-        for rec in records:
-            try:
-                # Pydantic モデルでバリデーション & 正規化
-                doc = EdinetDocument(**rec)
-                validated_records.append(doc.model_dump(by_alias=True))
-            except Exception as e:
-                logger.error(f"Validation failed for metadata (docID: {rec.get('docID')}): {e}")
+        try:
+            # Pydantic モデルで一括バリデーション & 正規化
+            validated_records = EdinetDocumentList.dump_python(
+                EdinetDocumentList.validate_python(records), by_alias=True
+            )
+        except ValidationError:
+            # 不正レコードを含む場合のみ1件ずつ検証し、不正分を除外する
+            validated_records = []
+            for rec in records:
+                try:
+                    doc = EdinetDocument(**rec)
+                    validated_records.append(doc.model_dump(by_alias=True))
+                except Exception as e:
+                    logger.error(f"Validation failed for metadata (docID: {rec.get('docID')}): {e}")
 
         logger.info(f"Metadata fetch completed: {len(validated_records)} documents")
         return validated_records
@@ -1,18 +1,106 @@
 import io
+import json
 import re
+import shutil
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict
+from typing import BinaryIO, Dict
 
 import pandas as pd
+import pyarrow.parquet as pq
 from loguru import logger
 
 from data_engine.core.network_utils import get_robust_session
-from data_engine.core.utils import normalize_code
+from data_engine.core.utils import normalize_codes
 
 # normalize_code is now imported from utils
 
 
+def parse_weight_series(s: pd.Series) -> pd.Series:
+    """
+    ウエイト列 ("1.23%" / "1.23" / 数値) を float 列へ一括変換する。
+    空文字は 0.0 とし、数値化できない値は従来通り例外とする。
+    """
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float)
+    clean = s.astype(str).str.replace("%", "", regex=False).str.strip().replace("", "0")
+    return pd.to_numeric(clean).astype(float)
+
+
+# ダウンロード時のコピー単位 (1MB)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# JPX銘柄マスタのキャッシュ (data_path 直下)
+JPX_CACHE_PARQUET_NAME = "jpx_master.parquet"
+JPX_CACHE_META_NAME = "jpx_master.meta.json"
+
+# JPX銘柄一覧 (data_j.xls) の読込対象列と ARIA モデルのカラム名の対応
+JPX_MASTER_COLUMNS = {
+    "コード": "code",
+    "銘柄名": "company_name",
+    "33業種コード": "sector_33_code",
+    "33業種区分": "sector_jpx_33",
+    "17業種コード": "sector_17_code",
+    "17業種区分": "sector_jpx_17",
+    "市場・商品区分": "market",
+    "規模コード": "size_code",
+    "規模区分": "size_category",
+}
+
+# 構成銘柄CSVのカラム名パターン (表記揺れ対応)
+CODE_COL_PATTERN = r"コード|Code"
+
+# 指数イベント履歴の列 (IndexEvent / SCHEMA_INDEX と同順)
+INDEX_HISTORY_COLS = ["date", "index_name", "code", "type", "old_value", "new_value"]
+
+
+def index_history_patterns(index_name: str) -> list:
+    """指数イベント履歴のリポジトリ内パターン (日次の追記ファイルと旧形式の history.parquet)"""
+    root = f"master/indices/{index_name}"
+    return [f"{root}/history/year=*/events_*.parquet", f"{root}/history.parquet"]
+
+
+def load_index_history(index_root: Path) -> pd.DataFrame:
+    """
+    指数イベント履歴を読み込む。
+    日次の追記ファイル (history/year=YYYY/events_YYYYMMDD.parquet) と旧形式の history.parquet を統合し、
+    重複排除は読み込み時に行う。
+    """
+    files = sorted(index_root.glob("history/year=*/events_*.parquet"))
+    legacy = index_root / "history.parquet"
+    if legacy.exists():
+        files.insert(0, legacy)
+    if not files:
+        return pd.DataFrame(columns=INDEX_HISTORY_COLS)
+
+    table = pq.ParquetDataset([str(f) for f in files], partitioning=None).read(columns=INDEX_HISTORY_COLS)
+    return table.to_pandas(types_mapper=pd.ArrowDtype).drop_duplicates(keep="last").reset_index(drop=True)
+
+
+def read_constituents_csv(source: BinaryIO, weight_pattern: str) -> tuple:
+    """
+    Shift-JIS の構成銘柄CSVから「コード」「ウエイト」列のみを読み込む。
+    レスポンスボディをストリームのまま C エンジンへ渡し、カラム名の正規表現に一致する列だけをパースする。
+    (フッター行の列数不一致に耐えるため C エンジンを使用)
+
+    Returns:
+        (df, code_col, weight_col)
+    """
+    code_re = re.compile(CODE_COL_PATTERN, re.IGNORECASE)
+    weight_re = re.compile(weight_pattern, re.IGNORECASE)
+    df = pd.read_csv(
+        source,
+        encoding="shift_jis",
+        engine="c",
+        usecols=lambda c: bool(code_re.search(c) or weight_re.search(c)),
+    )
+    code_col = next((c for c in df.columns if code_re.search(c)), None)
+    weight_col = next((c for c in df.columns if weight_re.search(c)), None)
+    if not code_col or not weight_col:
+        raise ValueError(f"必須カラムが見つかりません。Columns: {df.columns}")
+    return df, code_col, weight_col
+
+
 class IndexStrategy(ABC):
     """指数ごとのデータ取得ロジックの基底クラス"""
 
@@ -29,11 +117,13 @@ class IndexStrategy(ABC):
 class NikkeiStrategy(IndexStrategy):
     """日経225 (Nikkei Source) および同形式のCSV用"""
 
-    def __init__(self, url: str = None):
+    def __init__(self, url: str = None, session=None):
         # ユーザー指定のアーカイブ版URL (403を回避しやすい)
         default_url = "https://indexes.nikkei.co.jp/nkave/archives/file/nikkei_stock_average_weight_jp.csv"
         self.url = url if url else default_url
         self.index_name = "日経225"  # デフォルト
+        # MarketDataEngine から共有セッションを受け取り、Keep-Alive で接続を再利用する
+        self.session = session
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -45,127 +135,109 @@ class NikkeiStrategy(IndexStrategy):
 
     def fetch_data(self) -> pd.DataFrame:
         logger.info(f"{self.index_name}構成銘柄を取得中 (Archive CSV)...")
-        session = get_robust_session()
+        session = self.session or get_robust_session()
         try:
-            r = session.get(self.url, headers=self.headers)
+            r = session.get(self.url, headers=self.headers, stream=True)
+        except Exception as e:
+            logger.error(f"{self.index_name}リクエスト失敗: {e}")
+            raise
+
+        # 共有セッションのコネクションプールを枯渇させないよう、ステータス異常時も含めて必ず接続を返却する
+        with r:
             if r.status_code != 200:
                 logger.error(f"{self.index_name}取得エラー: HTTP {r.status_code}")
                 # HTTP 403 の場合は詳細なメッセージを出す
                 if r.status_code == 403:
                     logger.error("日経新聞社サイトからアクセスが拒絶されました (403)。")
                 r.raise_for_status()
-        except Exception as e:
-            logger.error(f"{self.index_name}リクエスト失敗: {e}")
-            raise
 
-        # Shift-JISでデコード
-        try:
-            # アーカイブCSV形式: 1行目がヘッダ。日付,銘柄名,コード,業種,ウエイト
-            df = pd.read_csv(io.BytesIO(r.content), encoding="shift_jis")
-
-            # 日経新聞のCSVは末尾に「データ取得元...」などの説明行が入ることがあるため、
-            # コードが数値として解釈できる行のみを残す
-            # また、カラム名に「ウエイト」と「ウエート」の表記揺れがあるため正規表現で対応
-            code_col = next((c for c in df.columns if re.search(r"コード|Code", c, re.IGNORECASE)), None)
-            weight_col = next(
-                (c for c in df.columns if re.search(r"ウエ[イート]|ウェ[イート]|Weight", c, re.IGNORECASE)), None
-            )
-
-            if not code_col or not weight_col:
-                raise ValueError(f"必須カラムが見つかりません。Columns: {df.columns}")
-
-            # クリーニング
-            df = df.dropna(subset=[code_col, weight_col])
-
-            # コードを文字列化 (JPプレフィックス付与)
-            df["code"] = df[code_col].astype(str).str.replace(".0", "", regex=False).str.strip().apply(
-                lambda x: normalize_code(x, nationality="JP")
-            )
-
-            # ウエイトのパース
-            def parse_weight(x):
-                if isinstance(x, str):
-                    clean = x.replace("%", "").strip()
-                    if not clean:
-                        return 0.0
-                    return float(clean)
-                return float(x)
-
-            df["weight"] = df[weight_col].apply(parse_weight)
-
-            logger.success(f"{self.index_name}データ取得成功: {len(df)} 件")
-            return df[["code", "weight"]]
+            # Shift-JISでデコード
+            try:
+                # アーカイブCSV形式: 1行目がヘッダ。日付,銘柄名,コード,業種,ウエイト
+                # 日経新聞のCSVは末尾に「データ取得元...」などの説明行が入ることがあるため、
+                # コードが数値として解釈できる行のみを残す
+                # また、カラム名に「ウエイト」と「ウエート」の表記揺れがあるため正規表現で対応
+                r.raw.decode_content = True
+                df, code_col, weight_col = read_constituents_csv(r.raw, r"ウエ[イート]|ウェ[イート]|Weight")
+
+                # クリーニング
+                df = df.dropna(subset=[code_col, weight_col])
+
+                # コードを文字列化 (JPプレフィックス付与)
+                df["code"] = normalize_codes(
+                    df[code_col].astype(str).str.replace(".0", "", regex=False).str.strip(), nationality="JP"
+                )
 
-        except Exception as e:
-            logger.error(f"{self.index_name}パース失敗: {e}")
-            raise e
+                # ウエイトのパース
+                df["weight"] = parse_weight_series(df[weight_col])
+
+                logger.success(f"{self.index_name}データ取得成功: {len(df)} 件")
+                return df[["code", "weight"]]
+
+            except Exception as e:
+                logger.error(f"{self.index_name}パース失敗: {e}")
+                raise e
 
 
 class TopixStrategy(IndexStrategy):
     """TOPIX (JPX Source)"""
 
-    def __init__(self):
+    def __init__(self, session=None):
         self.url = "https://www.jpx.co.jp/automation/markets/indices/topix/files/topixweight_j.csv"
+        self.session = session
 
     def fetch_data(self) -> pd.DataFrame:
         logger.info("TOPIX構成銘柄を取得中...")
-        session = get_robust_session()
-        r = session.get(self.url)
-        r.raise_for_status()
+        session = self.session or get_robust_session()
+        # ステータス異常時も含めて必ず接続を共有プールへ返却する
+        with session.get(self.url, stream=True) as r:
+            r.raise_for_status()
 
-        try:
-            # JPX CSV confirmed as Shift-JIS
-            df = pd.read_csv(io.BytesIO(r.content), encoding="shift_jis")
+            try:
+                # JPX CSV confirmed as Shift-JIS
+                # 想定カラム: 日付,銘柄名,コード,業種,TOPIXに占める個別銘柄のウエイト,ニューインデックス区分
+                # JPXの長大なヘッダや名称揺れにも正規表現で対応
+                r.raw.decode_content = True
+                df, code_col, weight_col = read_constituents_csv(r.raw, r"ウエ[イート]|Weight")
 
-            # 想定カラム: 日付,銘柄名,コード,業種,TOPIXに占める個別銘柄のウエイト,ニューインデックス区分
-            # JPXの長大なヘッダや名称揺れにも正規表現で対応
-            code_col = next((c for c in df.columns if re.search(r"コード|Code", c, re.IGNORECASE)), None)
-            weight_col = next((c for c in df.columns if re.search(r"ウエ[イート]|Weight", c, re.IGNORECASE)), None)
+                # フッター等の空行を削除
+                df = df.dropna(subset=[code_col, weight_col])
 
-            if not code_col or not weight_col:
-                raise ValueError(f"TOPIX必須カラム欠落: {df.columns}")
+                df = df[[code_col, weight_col]].rename(columns={code_col: "code", weight_col: "weight"})
 
-            # フッター等の空行を削除
-            df = df.dropna(subset=[code_col, weight_col])
+                # 型変換 (JPプレフィックス付与)
+                df["code"] = normalize_codes(df["code"].astype(str).str.strip(), nationality="JP")
 
-            df = df[[code_col, weight_col]].rename(columns={code_col: "code", weight_col: "weight"})
+                df["weight"] = parse_weight_series(df["weight"])
 
-            # 型変換 (JPプレフィックス付与)
-            df["code"] = df["code"].astype(str).str.strip().apply(lambda x: normalize_code(x, nationality="JP"))
+                logger.success(f"TOPIXデータ取得成功: {len(df)} 件")
+                return df[["code", "weight"]]
 
-            def parse_weight(x):
-                if isinstance(x, str):
-                    clean = x.replace("%", "").strip()
-                    if not clean:
-                        return 0.0
-                    return float(clean)
-                return float(x)
-
-            df["weight"] = df["weight"].apply(parse_weight)
-
-            logger.success(f"TOPIXデータ取得成功: {len(df)} 件")
-            return df[["code", "weight"]]
-
-        except Exception as e:
-            logger.error(f"TOPIXパース失敗: {e}")
-            raise e
+            except Exception as e:
+                logger.error(f"TOPIXパース失敗: {e}")
+                raise e
 
 
 class MarketDataEngine:
-    def __init__(self, data_path: Path):
+    def __init__(self, data_path: Path, session=None):
         self.data_path = data_path
+        # 全指数・JPXマスタの取得で1つのセッション (コネクションプール) を共有する
+        self.session = session or get_robust_session()
         self.strategies: Dict[str, IndexStrategy] = {
-            "Nikkei225": NikkeiStrategy(),
+            "Nikkei225": NikkeiStrategy(session=self.session),
             "NikkeiHighDiv50": NikkeiStrategy(
-                "https://indexes.nikkei.co.jp/nkave/archives/file/nikkei_high_dividend_yield_50_weight_jp.csv"
+                "https://indexes.nikkei.co.jp/nkave/archives/file/nikkei_high_dividend_yield_50_weight_jp.csv",
+                session=self.session,
             ),
             "JPXNikkei400": NikkeiStrategy(
-                "https://indexes.nikkei.co.jp/nkave/archives/file/jpx_nikkei_index_400_weight_jp.csv"
+                "https://indexes.nikkei.co.jp/nkave/archives/file/jpx_nikkei_index_400_weight_jp.csv",
+                session=self.session,
             ),
             "JPXNikkeiMidSmall": NikkeiStrategy(
-                "https://indexes.nikkei.co.jp/nkave/archives/file/jpx_nikkei_mid_small_weight_jp.csv"
+                "https://indexes.nikkei.co.jp/nkave/archives/file/jpx_nikkei_mid_small_weight_jp.csv",
+                session=self.session,
             ),
-            "TOPIX": TopixStrategy(),
+            "TOPIX": TopixStrategy(session=self.session),
         }
         # 各戦略に表示用の指数名を設定
         self.strategies["NikkeiHighDiv50"].index_name = "日経高配当50"
@@ -176,45 +248,72 @@ class MarketDataEngine:
 
         self.jpx_url = CONFIG.TSE_URL
 
+    def _load_jpx_cache(self):
+        """前回取得したJPXマスタのキャッシュ (検証子, 整形済みDataFrame) を読み込む"""
+        meta_path = self.data_path / JPX_CACHE_META_NAME
+        parquet_path = self.data_path / JPX_CACHE_PARQUET_NAME
+        if not (meta_path.exists() and parquet_path.exists()):
+            return {}, None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return meta, pd.read_parquet(parquet_path)
+        except Exception as e:
+            logger.warning(f"JPXマスタのキャッシュ読込に失敗したため再取得します: {e}")
+            return {}, None
+
+    def _save_jpx_cache(self, r, df: pd.DataFrame):
+        """整形済みJPXマスタと ETag / Last-Modified をキャッシュとして保存"""
+        meta = {k: r.headers[h] for k, h in (("etag", "ETag"), ("last_modified", "Last-Modified")) if h in r.headers}
+        if not meta:
+            return
+        try:
+            self.data_path.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(self.data_path / JPX_CACHE_PARQUET_NAME, index=False, compression="zstd")
+            (self.data_path / JPX_CACHE_META_NAME).write_text(json.dumps(meta), encoding="utf-8")
+        except Exception as e:
+            logger.warning(f"JPXマスタのキャッシュ保存に失敗しました: {e}")
+
     def fetch_jpx_master(self) -> pd.DataFrame:
-        """JPXから最新の銘柄一覧を取得 (Retry付き)"""
+        """JPXから最新の銘柄一覧を取得 (Retry付き / ETag・Last-Modified による条件付きGET)"""
         logger.info("JPX銘柄マスタを取得中...")
-        session = get_robust_session()
-        r = session.get(self.jpx_url, stream=True)
-        r.raise_for_status()
-
-        # 保存して読み込む (Excel形式のため)
-        from data_engine.core.config import CONFIG
-
-        CONFIG.TEMP_DIR.mkdir(parents=True, exist_ok=True)
-        xls_path = CONFIG.TEMP_DIR / "jpx_master.xls"
-        with xls_path.open("wb") as f:
-            for chunk in r.iter_content(1024):
-                f.write(chunk)
-
-        df = pd.read_excel(xls_path, dtype={"コード": str})
+        meta, cached_df = self._load_jpx_cache()
+        headers = {}
+        if cached_df is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self.session.get(self.jpx_url, headers=headers, stream=True) as r:
+            if r.status_code == 304 and cached_df is not None:
+                logger.info("JPX銘柄マスタに更新がないため、キャッシュを使用します。")
+                return cached_df
+            r.raise_for_status()
+
+            # ディスクを経由せずメモリ上に受信して読み込む (1MB チャンクでコピー)
+            buf = io.BytesIO()
+            r.raw.decode_content = True
+            shutil.copyfileobj(r.raw, buf, length=DOWNLOAD_CHUNK_SIZE)
+
+        # 必要列のみを Rust 製の calamine で読み込む (未導入環境では既定エンジンへフォールバック)
+        read_kwargs = {"dtype": {"コード": str}, "usecols": list(JPX_MASTER_COLUMNS)}
+        try:
+            buf.seek(0)
+            df = pd.read_excel(buf, engine="calamine", **read_kwargs)
+        except ImportError:
+            logger.debug("python-calamine が未導入のため既定エンジンで読み込みます。")
+            buf.seek(0)
+            df = pd.read_excel(buf, **read_kwargs)
         # カラムマッピング (ARIAモデルの定義に合わせる)
-        df = df.rename(
-            columns={
-                "コード": "code",
-                "銘柄名": "company_name",
-                "33業種コード": "sector_33_code",
-                "33業種区分": "sector_jpx_33",
-                "17業種コード": "sector_17_code",
-                "17業種区分": "sector_jpx_17",
-                "市場・商品区分": "market",
-                "規模コード": "size_code",
-                "規模区分": "size_category",
-            }
-        )
+        df = df.rename(columns=JPX_MASTER_COLUMNS)
         # 数値カラムのゴミ（"-" 等）を処理
         for col in ["sector_33_code", "sector_17_code", "size_code"]:
             if col in df.columns:
                 df[col] = df[col].astype(str).str.strip().replace("-", None)
 
-        df["code"] = df["code"].astype(str).str.strip().apply(lambda x: normalize_code(x, nationality="JP"))
+        df["code"] = normalize_codes(df["code"].astype(str).str.strip(), nationality="JP")
 
-        return df[
+        df = df[
             [
                 "code",
                 "company_name",
@@ -227,6 +326,8 @@ class MarketDataEngine:
                 "size_category",
             ]
         ]
+        self._save_jpx_cache(r, df)
+        return df
 
     def fetch_index_data(self, index_name: str) -> pd.DataFrame:
         """指数データの取得 (Retry付き)"""
@@ -239,56 +340,39 @@ class MarketDataEngine:
         self, index_name: str, old_const: pd.DataFrame, new_const: pd.DataFrame, date_str: str
     ) -> pd.DataFrame:
         """指数イベント差分生成 (ADD, REMOVE, UPDATE)"""
-        events = []
-
-        # 辞書化 {code: weight}
-        old_map = dict(zip(old_const["code"], old_const["weight"])) if not old_const.empty else {}
-        new_map = dict(zip(new_const["code"], new_const["weight"])) if not new_const.empty else {}
-
-        old_keys = set(old_map.keys())
-        new_keys = set(new_map.keys())
-
-        # ADD
-        for code in new_keys - old_keys:
-            events.append(
-                {
-                    "date": date_str,
-                    "index_name": index_name,
-                    "code": code,
-                    "type": "ADD",
-                    "old_value": None,
-                    "new_value": new_map[code],
-                }
-            )
-
-        # REMOVE
-        for code in old_keys - new_keys:
-            events.append(
-                {
-                    "date": date_str,
-                    "index_name": index_name,
-                    "code": code,
-                    "type": "REMOVE",
-                    "old_value": old_map[code],
-                    "new_value": None,
-                }
-            )
-
-        # UPDATE (共通部分でウエイト変化)
-        for code in new_keys & old_keys:
-            v_old = old_map[code]
-            v_new = new_map[code]
-            # 浮動小数点比較 (許容誤差 1e-6)
-            if abs(v_old - v_new) > 1e-6:
-                events.append(
-                    {
-                        "date": date_str,
-                        "index_name": index_name,
-                        "code": code,
-                        "type": "UPDATE",
-                        "old_value": v_old,
-                        "new_value": v_new,
-                    }
-                )
+        columns = ["date", "index_name", "code", "type", "old_value", "new_value"]
+
+        def _weights(df: pd.DataFrame) -> pd.DataFrame:
+            if df.empty:
+                return pd.DataFrame({"code": pd.Series(dtype=object), "weight": pd.Series(dtype=float)})
+            # 同一コードが重複する場合は後勝ち (旧実装の dict 化と同じ挙動)
+            return df[["code", "weight"]].drop_duplicates(subset="code", keep="last")
+
+        merged = _weights(old_const).merge(
+            _weights(new_const),
+            on="code",
+            how="outer",
+            suffixes=("_old", "_new"),
+            indicator=True,
+            validate="one_to_one",
+        )
+
+        is_add = merged["_merge"] == "right_only"
+        is_remove = merged["_merge"] == "left_only"
+        # UPDATE (共通部分でウエイト変化 / 浮動小数点比較 許容誤差 1e-6)
+        is_update = (merged["_merge"] == "both") & ((merged["weight_new"] - merged["weight_old"]).abs() > 1e-6)
+
+        parts = [
+            merged.loc[is_add].assign(type="ADD", old_value=None, new_value=lambda d: d["weight_new"]),
+            merged.loc[is_remove].assign(type="REMOVE", old_value=lambda d: d["weight_old"], new_value=None),
+            merged.loc[is_update].assign(
+                type="UPDATE", old_value=lambda d: d["weight_old"], new_value=lambda d: d["weight_new"]
+            ),
+        ]
+        parts = [p for p in parts if not p.empty]
+        if not parts:
+            return pd.DataFrame(columns=columns)
+
+        events = pd.concat(parts, ignore_index=True)
 
-        return pd.DataFrame(events, columns=["date", "index_name", "code", "type", "old_value", "new_value"])
+        return events.assign(date=date_str, index_name=index_name)[columns]
@@ -1,7 +1,11 @@
+import hashlib
 import time
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from huggingface_hub import HfApi, hf_hub_download
 from huggingface_hub.utils import HfHubHTTPError
 from loguru import logger
@@ -38,6 +42,53 @@ class MasterMerger:
 
         return "No"
 
+    def get_bin_ids(self, df: pd.DataFrame) -> pd.Series:
+        """get_bin_id の一括版。各行の分散キーを列演算でまとめて導出する"""
+
+        def _valid(col: str, core_only: bool = False):
+            s = df[col] if col in df.columns else pd.Series("", index=df.index)
+            s = s.fillna("").astype(str).str.strip()
+            if core_only:
+                s = s.str.split(":").str[-1]
+            ok = (s.str.len() >= 2) & ~s.str.lower().isin(["none", "nan", "null"])
+            return s, ok
+
+        e_code, e_ok = _valid("edinet_code")
+        c_code, c_ok = _valid("code", core_only=True)
+        if "jcn" in df.columns and pd.api.types.is_integer_dtype(df["jcn"]):
+            # 整数型の法人番号は文字列化せず、剰余で末尾2桁を求める
+            j_ok = (df["jcn"] >= 10).fillna(False)
+            jcn_bin = (df["jcn"] % 100).astype(str).str.zfill(2)
+        else:
+            jcn_val, j_ok = _valid("jcn")
+            jcn_bin = jcn_val.str[-2:]
+
+        # 優先度の低い順に上書き (EDINET Code 最優先)
+        bin_ids = pd.Series("No", index=df.index, dtype=object)
+        bin_ids = bin_ids.mask(j_ok, "J" + jcn_bin)
+        bin_ids = bin_ids.mask(c_ok, "P" + c_code.str[-3:-1])
+        return bin_ids.mask(e_ok, "E" + e_code.str[-2:])
+
+    @staticmethod
+    def _to_arrow(df: pd.DataFrame, schema) -> pa.Table:
+        """
+        保存用の Arrow テーブルへ一括変換する。
+        スキーマが既知の場合は列ごとの型変換をせず、Arrow 側で一度にキャストする。
+        未知の場合は推論に委ねる（ただし真のNullは維持）。
+        """
+        if schema is not None:
+            return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        return pa.Table.from_pandas(df.convert_dtypes(), preserve_index=False)
+
+    @staticmethod
+    def _content_digest(table: pa.Table) -> str:
+        """保存される内容のハッシュ (行順に依存しない SHA-256)"""
+        normalized = table.to_pandas(ignore_metadata=True)
+        row_hashes = np.sort(pd.util.hash_pandas_object(normalized, index=False).to_numpy())
+        h = hashlib.sha256("\x1f".join(table.column_names).encode("utf-8"))
+        h.update(row_hashes.tobytes())
+        return h.hexdigest()
+
     def merge_and_upload(
         self,
         bin_id: str,
@@ -53,9 +104,18 @@ class MasterMerger:
         if new_data.empty:
             return True
 
-        # bin_id が指定されていない場合は先頭レコードから導出
+        # bin_id が指定されていない場合はレコードごとに導出し、Bin 単位に分割して処理
         if not bin_id:
-            bin_id = self.get_bin_id(new_data.iloc[0].to_dict())
+            bin_ids = self.get_bin_ids(new_data)
+            if bin_ids.nunique() > 1:
+                results = [
+                    self.merge_and_upload(
+                        b_id, master_type, part, worker_mode, catalog_manager, run_id, chunk_id, defer
+                    )
+                    for b_id, part in new_data.groupby(bin_ids, sort=False)
+                ]
+                return all(results)
+            bin_id = bin_ids.iloc[0]
 
         if worker_mode:
             filename = f"{master_type}_bin{bin_id}.parquet"
@@ -73,9 +133,10 @@ class MasterMerger:
         repo_path = f"master/{master_type}/bin={bin_id}/data.parquet"
 
         # 1. 既存データのロード
+        master_df = None
         try:
             m_path = hf_hub_download(repo_id=self.hf_repo, filename=repo_path, repo_type="dataset", token=self.hf_token)
-            master_df = pd.read_parquet(m_path)
+            master_df = pd.read_parquet(m_path, dtype_backend="pyarrow")
             logger.debug(f"既存Master読み込み: bin={bin_id} ({len(master_df)} rows)")
             combined_df = pd.concat([master_df, new_data], ignore_index=True)
         except Exception:
@@ -85,27 +146,42 @@ class MasterMerger:
         # 2. 重複排除 (最新優先)
         subset = ["docid", "key", "context_ref"] if master_type == "financial_values" else ["docid", "key"]
 
+        # 全体ソートは行わず、キーごとの最新 submitDateTime を持つ行のみを残す
+        # (同時刻の場合は後から結合された新データを優先)
         if "submitDateTime" in combined_df.columns:
-            combined_df = combined_df.sort_values("submitDateTime", ascending=False)
+            latest = combined_df.groupby(subset, sort=False, dropna=False)["submitDateTime"].transform("max")
+            combined_df = combined_df[(combined_df["submitDateTime"] == latest) | latest.isna()]
 
-        combined_df = combined_df.drop_duplicates(subset=subset, keep="first")
+        combined_df = combined_df.drop_duplicates(subset=subset, keep="last")
 
         # 3. 保存とアップロード
         local_file = self.data_path / f"master_bin{bin_id}_{master_type}.parquet"
 
-        # 【極限ガード】NULL 基底アーキテクチャの死守
-        # 全量文字列化を廃止し、型の誠実性を保つ
-        combined_df = combined_df.convert_dtypes()
-
         local_file.parent.mkdir(parents=True, exist_ok=True)
-        
+
         # 【Phase 7: Perfect Integrity】レジストリから金型を抽出し適用
         from data_engine.core.models import ARIA_SCHEMAS
+
         schema = ARIA_SCHEMAS.get(master_type)
-        
+
+        # 【極限ガード】NULL 基底アーキテクチャの死守
+        # 全量文字列化を廃止し、型の誠実性を保つ
         # ビンファイルはXBRLの動的拡張を含む可能性があるため、
-        # スキーマが既知の場合はそれを優先し、未知の場合は推論に委ねる（ただし真のNullは維持）
-        combined_df.to_parquet(local_file, compression="zstd", index=False, schema=schema)
+        # スキーマが既知の場合はそれを優先し、未知の場合は推論に委ねる
+        table = self._to_arrow(combined_df, schema)
+
+        # 【冪等性】保存対象の内容が既存ビンと同一であれば書き込み・アップロードを省略
+        if master_df is not None:
+            try:
+                unchanged = self._content_digest(table) == self._content_digest(self._to_arrow(master_df, schema))
+            except Exception as e:
+                logger.debug(f"既存Masterとの内容比較をスキップ: bin={bin_id} ({e})")
+                unchanged = False
+            if unchanged:
+                logger.debug(f"Master変更なしのためアップロードを省略: bin={bin_id} ({master_type})")
+                return True
+
+        pq.write_table(table, local_file, compression="zstd")
 
         if self.api:
             # 【重要】defer=True の場合は、モードに関わらずコミットバッファに積む
@@ -27,7 +27,7 @@ class MergerEngine:
         if "catalog" in deltas:
             df_cat = deltas["catalog"]
             logger.info(f"カタログデルタをマージ中: {len(df_cat)} 件")
-            self.catalog.update_catalog(df_cat.to_dict("records"))
+            self.catalog.update_catalog(df_cat)
 
         # 4. マスタデータ (financial / qualitative) のマージ
         # 業種・Binごとに分割されたデータを統合して MasterMerger に渡す
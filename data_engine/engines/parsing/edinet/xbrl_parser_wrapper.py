@@ -211,39 +211,29 @@ def get_xbrl_wrapper(docid,zip_file:str,temp_dir:Path,out_path:Path,update_flg=F
         #data_dir_raw=PROJDIR / "data" / "1_raw"
         #zip_file = list(data_dir_raw.glob("data_pool_*/"+docid+".zip"))[0]
         with ZipFile(str(zip_file)) as zf:
-            # すべての .xbrl ファイルを抽出（IFRS書類は複数インスタンスを持つ）
-            fn=[item for item in zf.namelist() if item.endswith(".xbrl") and "PublicDoc" in item]
-            if len(fn)>0:
-                for f in fn:
-                    zf.extract(f, out_path)
-                log_dict["is_xbrl_file"] = True
-            else:
-                log_dict["is_xbrl_file"] = False
-            # すべての .xsd ファイルを抽出
-            fn=[item for item in zf.namelist() if item.endswith(".xsd") and "PublicDoc" in item]
-            if len(fn)>0:
-                for f in fn:
-                    zf.extract(f, out_path)
-                log_dict["is_xsd_file"] = True
-            else:
-                log_dict["is_xsd_file"] = False
-            # すべての def.xml ファイルを抽出
-            fn=[item for item in zf.namelist() if item.endswith("def.xml") and "PublicDoc" in item]
-            if len(fn)>0:
-                for f in fn:
-                    zf.extract(f, out_path)
-                log_dict["is_def_file"] = True
-            else:
-                log_dict["is_def_file"] = False
+            # namelist を 1 回だけ走査し、.xbrl / .xsd / def.xml を振り分けて抽出（IFRS書類は複数インスタンスを持つ）
+            members={".xbrl":[], ".xsd":[], "def.xml":[]}
+            for item in zf.namelist():
+                if "PublicDoc" not in item:
+                    continue
+                for suffix,fn in members.items():
+                    if item.endswith(suffix):
+                        zf.extract(item, out_path)
+                        fn.append(item)
+                        break
+            log_dict["is_xbrl_file"] = len(members[".xbrl"])>0
+            log_dict["is_xsd_file"] = len(members[".xsd"])>0
+            log_dict["is_def_file"] = len(members["def.xml"])>0
         xbrl_path=out_path / "XBRL" / "PublicDoc"
 
-        # xbrl and xsd and def files must exist
-        has_xbrl = len(list(xbrl_path.glob("*.xbrl"))) > 0
-        has_xsd = len(list(xbrl_path.glob("*.xsd"))) > 0
-        has_def = len(list(xbrl_path.glob("*def.xml"))) > 0
+        # xbrl and xsd and def files must exist (抽出済みメンバーから判定し、ディレクトリの再走査を省く)
+        public_doc={k:[out_path / m for m in v if Path(m).parent==Path("XBRL/PublicDoc")] for k,v in members.items()}
+        has_xbrl = len(public_doc[".xbrl"]) > 0
+        has_xsd = len(public_doc[".xsd"]) > 0
+        has_def = len(public_doc["def.xml"]) > 0
 
         if has_xbrl and has_xsd and has_def:
-            all_xbrl_files = list(xbrl_path.glob("*.xbrl"))
+            all_xbrl_files = public_doc[".xbrl"]
             all_parsed_dfs = []
             
             for xbrl_f in all_xbrl_files:
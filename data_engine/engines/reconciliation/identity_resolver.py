@@ -1,12 +1,17 @@
+import re
+
+import numpy as np
 import pandas as pd
 from loguru import logger
-from data_engine.core.utils import normalize_code
+from data_engine.core.utils import normalize_codes
 
 
 class IdentityResolver:
     """証券コードと EDINET コードの架け橋（Bridging）および破棄ルールを担当"""
 
     SPECIAL_MARKET_KEYWORDS = ["ETF", "REIT", "PRO MARKET"]
+    # 市場区分の特殊判定用 (大文字小文字を区別しない事前コンパイル済みパターン)
+    SPECIAL_MARKET_RE = re.compile("|".join(map(re.escape, SPECIAL_MARKET_KEYWORDS)), re.IGNORECASE)
 
     def __init__(self, catalog_manager):
         self.cm = catalog_manager
@@ -28,29 +33,28 @@ class IdentityResolver:
             return incoming_data
 
         # 証券コード -> EDINET コード の逆引き辞書 (Pydanticモデルと辞書の両方に対応)
-        sec_to_edinet = {}
-        for k, v in self.cm.edinet_codes.items():
-            # 【ARIA 正規化の徹底】EdinetCodeRecord 生成時に正規化されているはずだが、
-            # 万一の漏れや型不一致を防ぐためここで再度 normalize_code を通す
-            raw_c = getattr(v, "code", None) if hasattr(v, "code") else v.get("code")
-            if raw_c:
-                norm_c = normalize_code(raw_c, nationality="JP")
-                if norm_c:
-                    sec_to_edinet[norm_c] = k
+        # 【ARIA 正規化の徹底】EdinetCodeRecord 生成時に正規化されているはずだが、
+        # 万一の漏れや型不一致を防ぐためここで再度 normalize_codes を通す (同一コードは後勝ち)
+        raw_codes = pd.Series(
+            {
+                k: (getattr(v, "code", None) if hasattr(v, "code") else v.get("code"))
+                for k, v in self.cm.edinet_codes.items()
+            },
+            dtype=object,
+        )
+        norm_codes = normalize_codes(raw_codes, nationality="JP").dropna()
+        sec_to_edinet = dict(zip(norm_codes, norm_codes.index, strict=True))
 
         if not sec_to_edinet:
             logger.warning("EDINETコードの逆引き辞書が空です。補完をスキップします。")
             return incoming_data
 
-        def fill_fn(row):
-            e_code = row.get("edinet_code")
-            # row["code"] も normalize 済みであることを前提とする（reconciliation_engine で実施済）
-            sec_code = row.get("code")
-            if (pd.isna(e_code) or e_code is None) and sec_code in sec_to_edinet:
-                return sec_to_edinet[sec_code]
-            return e_code
-
-        incoming_data["edinet_code"] = incoming_data.apply(fill_fn, axis=1)
+        # EDINET コードが欠損している行のみ、証券コードで辞書を引いて一括補完する
+        # (JPX 由来の証券コードはこの時点で未正規化 (例: "1332") のため、辞書側と同じ正規化を通して引く)
+        missing = pd.Series(None, index=incoming_data.index, dtype=object)
+        e_code = incoming_data.get("edinet_code", missing)
+        resolved = normalize_codes(incoming_data.get("code", missing), nationality="JP").map(sec_to_edinet)
+        incoming_data["edinet_code"] = e_code.where(e_code.notna(), resolved)
         return incoming_data
 
     def apply_disposal_rule(self, incoming_data: pd.DataFrame) -> pd.DataFrame:
@@ -59,24 +63,25 @@ class IdentityResolver:
         if not is_jpx_update:
             return incoming_data
 
-        filtered_list = []
-        discarded_details = []
-        for _, row in incoming_data.iterrows():
-            market = str(row.get("market") or "").upper()
-            is_special = any(x in market for x in self.SPECIAL_MARKET_KEYWORDS)
-            sec_code = str(row.get("code") or "")
-            # 正規化済み証券コードの5桁目（末尾0）以外を優先株と判定
-            is_preferred = sec_code and sec_code[-1] != "0"
-            
-            # EDINETコードの存否を確認
-            has_edinet = pd.notna(row.get("edinet_code")) and row.get("edinet_code") is not None
-
-            # 普通株式 (5桁目0) かつ EDINET未登録 かつ 特殊でない銘柄は破棄
-            # (理由: JPXデータのみに存在する普通株は、ARIAの収集対象外であるため)
-            if not is_special and not is_preferred and not has_edinet:
-                discarded_details.append(f"{sec_code} ({row.get('company_name')})")
-                continue
-            filtered_list.append(row)
+        # 市場区分はユニーク値のみ正規表現で判定し、行へは整数コード経由で展開する
+        missing = pd.Series(None, index=incoming_data.index, dtype=object)
+        market = incoming_data.get("market", missing)
+        market_codes, market_uniques = pd.factorize(market.fillna("").astype(str))
+        special_uniques = np.array([bool(self.SPECIAL_MARKET_RE.search(m)) for m in market_uniques], dtype=bool)
+        is_special = special_uniques[market_codes] if len(market_uniques) else np.zeros(len(incoming_data), dtype=bool)
+
+        # 正規化済み証券コードの5桁目（末尾0）以外を優先株と判定
+        sec_code = incoming_data.get("code", missing).fillna("").astype(str)
+        is_preferred = (sec_code != "") & (sec_code.str[-1] != "0")
+
+        # EDINETコードの存否を確認
+        has_edinet = incoming_data.get("edinet_code", missing).notna()
+
+        # 普通株式 (5桁目0) かつ EDINET未登録 かつ 特殊でない銘柄は破棄
+        # (理由: JPXデータのみに存在する普通株は、ARIAの収集対象外であるため)
+        keep = is_special | is_preferred.to_numpy() | has_edinet.to_numpy()
+        names = incoming_data.get("company_name", missing)[~keep].map(str)
+        discarded_details = (sec_code[~keep] + " (" + names + ")").tolist()
 
         if discarded_details:
             logger.info(f"🗑️ JPX 不要レコード破棄 (普通株式/EDINET未登録): {len(discarded_details)} 件")
@@ -85,4 +90,4 @@ class IdentityResolver:
             sample = discarded_details[:sample_size]
             logger.info(f"破棄銘柄: {', '.join(sample)}{' ...' if len(discarded_details) > sample_size else ''}")
 
-        return pd.DataFrame(filtered_list)
+        return incoming_data.loc[keep]
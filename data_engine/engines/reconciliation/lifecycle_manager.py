@@ -32,35 +32,53 @@ class LifecycleManager:
         
         return new_master_df
 
-    def detect_listing_events(self, latest_rec, current_master_df: pd.DataFrame) -> list:
-        """上場・廃止イベントの検知 (is_active の変化に基づく)"""
-        events = []
+    def detect_listing_events(self, new_master_df: pd.DataFrame, current_master_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        上場・廃止イベントの一括検知 (is_active の変化に基づく)
+        新旧マスタをコードで突き合わせ、ベクトル演算で LISTING / DELISTING を抽出する。
+        """
+        columns = ["code", "type", "event_date"]
+        if new_master_df.empty or "code" not in new_master_df.columns:
+            return pd.DataFrame(columns=columns)
+
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        code = latest_rec.get("code")
-        if not code or pd.isna(code):
-            return events
 
-        # is_active の現在値
-        is_active_now = latest_rec.get("is_active", True)
-        
-        if current_master_df.empty:
-            if is_active_now:
-                events.append({"code": code, "type": "LISTING", "event_date": today})
-            return events
+        codes = new_master_df["code"]
+        valid = codes.notna() & (codes.astype(str) != "")
+        new_df = pd.DataFrame({"code": codes[valid]})
+        # is_active の現在値 (欠損は Active 扱い)
+        if "is_active" in new_master_df.columns:
+            new_df["is_active_now"] = new_master_df.loc[valid, "is_active"].fillna(True).astype(bool)
+        else:
+            new_df["is_active_now"] = True
 
-        old_row = current_master_df[current_master_df["code"] == code]
-        
-        if not old_row.empty:
-            was_active = old_row.iloc[0].get("is_active", True)
-            if was_active and not is_active_now:
-                events.append({"code": code, "type": "DELISTING", "event_date": today})
-            elif not was_active and is_active_now:
-                events.append({"code": code, "type": "LISTING", "event_date": today})
-        elif is_active_now:
-            # 新規発見
-            events.append({"code": code, "type": "LISTING", "event_date": today})
-            
-        return events
+        if current_master_df.empty or "code" not in current_master_df.columns:
+            old_df = pd.DataFrame({"code": pd.Series(dtype=new_df["code"].dtype), "was_active": pd.Series(dtype=bool)})
+        else:
+            # 旧マスタの同一コードは先頭行を採用 (旧実装の iloc[0] と同じ)
+            old_df = current_master_df.drop_duplicates(subset="code", keep="first")
+            was_active = old_df["is_active"] if "is_active" in old_df.columns else pd.Series(True, index=old_df.index)
+            old_df = pd.DataFrame({"code": old_df["code"], "was_active": was_active.fillna(True).astype(bool)})
+
+        # 旧側は code で一意化済み。キー重複による行の増殖は validate で即座に検知する
+        merged = new_df.merge(old_df, on="code", how="left", indicator=True, validate="many_to_one")
+        is_known = merged["_merge"] == "both"
+        was_active = merged["was_active"].fillna(False).astype(bool)
+        now_active = merged["is_active_now"]
+
+        # 新規発見 or 非Active→Active は LISTING、Active→非Active は DELISTING
+        is_listing = now_active & (~is_known | ~was_active)
+        is_delisting = is_known & was_active & ~now_active
+
+        events = pd.concat(
+            [
+                merged.loc[is_listing, ["code"]].assign(type="LISTING"),
+                merged.loc[is_delisting, ["code"]].assign(type="DELISTING"),
+            ],
+            ignore_index=True,
+        )
+        events["event_date"] = today
+        return events[columns]
 
     def setup_parent_code(self, rec: dict) -> dict:
         """【Parenting】優先株の親紐付け設定"""
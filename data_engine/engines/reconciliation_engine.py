@@ -12,6 +12,16 @@ from data_engine.core.models import StockMasterRecord
 from data_engine.core.utils import normalize_code
 from data_engine.engines.reconciliation import IdentityResolver, LifecycleManager
 
+# JPX 定義 (Dimension Table) の抽出元: (定義種別, コード列, 名称列)
+JPX_DEF_COLUMNS = [
+    ("sector_33", "sector_33_code", "sector_jpx_33"),
+    ("sector_17", "sector_17_code", "sector_jpx_17"),
+    ("size", "size_code", "size_category"),
+]
+
+# 社名正規化で除去する法的形態の表記
+COMPANY_NAME_NOISE = ["株式会社", "有限会社", "合同会社", "（株）", "(株)", "（有）", "(有)"]
+
 
 class ReconciliationEngine:
     """
@@ -132,6 +142,13 @@ class ReconciliationEngine:
         # 3. 事前処理: プレフィックス正規化と親子紐付け
         processed_records: List[Dict[str, Any]] = []
         current_codes_in_run = set()
+        # 既存マスタはコードで一度だけ索引化し、行ごとの全件走査 (ブールマスク生成) を避ける
+        # (同一コードが重複する場合は先頭行を採用)
+        master_df = self.cm.master_df
+        if "code" in master_df.columns:
+            master_by_code = master_df.drop_duplicates(subset="code", keep="first").set_index("code", drop=False)
+        else:
+            master_by_code = pd.DataFrame(index=pd.Index([], name="code"))
         for _, row in incoming_data.iterrows():
             rec: Dict[str, Any] = row.to_dict()
             rec = {k: v for k, v in rec.items() if not pd.isna(v) and v is not None}
@@ -155,13 +172,11 @@ class ReconciliationEngine:
             if identity_key:
                 rec["identity_key"] = identity_key
 
-            if not self.cm.master_df.empty and sec_code:
-                m_row = self.cm.master_df[self.cm.master_df["code"] == sec_code]
-                if not m_row.empty:
-                    m_rec = m_row.iloc[0].to_dict()
-                    for k, v in m_rec.items():
-                        if k not in rec or rec[k] is None:
-                            rec[k] = v
+            if sec_code and sec_code in master_by_code.index:
+                m_rec = master_by_code.loc[sec_code].to_dict()
+                for k, v in m_rec.items():
+                    if k not in rec or rec[k] is None:
+                        rec[k] = v
 
             try:
                 # StockMasterRecord による金型ガード
@@ -224,7 +239,6 @@ class ReconciliationEngine:
         # これにより、日付が同じ（または無い）場合に新規データを優先する
         all_states["_priority"] = 0
         all_states.loc[all_states.index[len(current_m):], "_priority"] = 1
-        jpx_defs: List[Dict[str, str]] = []
         best_records: List[Dict[str, Any]] = []
 
         # 【要点】dropna=True (デフォルト) にすることで、万一 identity_key が Null の行があっても無視される
@@ -277,13 +291,13 @@ class ReconciliationEngine:
                 # それ以外（EDINET上場、あるいはEDINET未登録のETF等）は通常通り判定
                 latest_rec["is_active"] = is_listed_edinet or from_jpx
 
-            # JPX 定義の収集 (Dimension Table)
-            self._collect_jpx_defs(latest_rec, jpx_defs)
-
             best_records.append(latest_rec)
 
         # 5. 【Tracking】消失銘柄の判定
         new_master_df = pd.DataFrame(best_records)
+
+        # JPX 定義の収集 (Dimension Table)
+        jpx_defs = self._extract_jpx_defs(new_master_df)
         
         # 【物理的整律】StockMasterRecord の定義に従ってカラム順序を固定
         master_cols = list(StockMasterRecord.model_fields.keys())
@@ -297,16 +311,14 @@ class ReconciliationEngine:
 
         # 6. 【Event Detection】上場・廃止イベントの一括検知
         # 消失判定（is_active変更）後の最終的なマスタ状態から変化を抽出
-        listing_events: List[Dict[str, Any]] = []
-        for _, row in new_master_df.iterrows():
-            listing_events.extend(self.lifecycle.detect_listing_events(row.to_dict(), current_m))
+        listing_events = self.lifecycle.detect_listing_events(new_master_df, current_m)
 
         self.cm.master_df = new_master_df
 
         # 7. 【Redundancy Management】名称の厳格同期
         # マスタ内の名称を jpx_definitions の「正解」で上書きし、不一致を物理的に排除する
-        if jpx_defs:
-            df_defs = pd.DataFrame(jpx_defs).drop_duplicates(subset=["type", "code"])
+        if not jpx_defs.empty:
+            df_defs = jpx_defs.drop_duplicates(subset=["type", "code"])
             self.cm.master_df = self._resolve_with_definitions(self.cm.master_df, df_defs)
 
         # メタデータの保存 (Master, Listing History, JPX Definitions)
@@ -344,28 +356,36 @@ class ReconciliationEngine:
         
         return master_df
 
-    def _collect_jpx_defs(self, rec, jpx_defs: list):
-        """業種・規模名称のマッピング定義を収集（正規化のため）"""
-        s33_c = rec.get("sector_33_code")
-        if s33_c and not pd.isna(s33_c):
-            jpx_defs.append({"type": "sector_33", "code": str(s33_c), "name": rec.get("sector_jpx_33")})
-        
-        s17_c = rec.get("sector_17_code")
-        if s17_c and not pd.isna(s17_c):
-            jpx_defs.append({"type": "sector_17", "code": str(s17_c), "name": rec.get("sector_jpx_17")})
-        
-        sz_c = rec.get("size_code")
-        if sz_c and not pd.isna(sz_c):
-            jpx_defs.append({"type": "size", "code": str(sz_c), "name": rec.get("size_category")})
+    def _extract_jpx_defs(self, master_df: pd.DataFrame) -> pd.DataFrame:
+        """業種・規模名称のマッピング定義をマスタ全体から列単位で一括抽出（正規化のため）"""
+        frames = []
+        for def_type, code_col, name_col in JPX_DEF_COLUMNS:
+            if code_col not in master_df.columns:
+                continue
+            codes = master_df[code_col]
+            mask = codes.notna() & (codes.astype(str) != "")
+            names = master_df[name_col] if name_col in master_df.columns else pd.Series(None, index=master_df.index)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "type": def_type,
+                        "code": codes[mask].astype(str).to_numpy(),
+                        "name": names[mask].to_numpy(),
+                    }
+                )
+            )
+        if not frames:
+            return pd.DataFrame(columns=["type", "code", "name"])
+        return pd.concat(frames, ignore_index=True)
 
     def _save_metadata(self, jpx_defs, listing_events):
         """マスタ付随メタデータの保存"""
-        if jpx_defs:
+        if not jpx_defs.empty:
             from datetime import date, timedelta
             today_str = date.today().isoformat()
             yesterday_str = (date.today() - timedelta(days=1)).isoformat()
             
-            df_defs = pd.DataFrame(jpx_defs).drop_duplicates(subset=["type", "code"]).dropna(subset=["code"])
+            df_defs = jpx_defs.drop_duplicates(subset=["type", "code"]).dropna(subset=["code"])
             
             if not df_defs.empty:
                 try:
@@ -415,50 +435,60 @@ class ReconciliationEngine:
                 final_defs = final_defs[[c for c in final_cols if c in final_defs.columns]].sort_values(["type", "code", "valid_from"])    
                 self.cm.hf.save_and_upload("jpx_definitions", final_defs, defer=True)
 
-        if listing_events:
-            events_df = pd.DataFrame(listing_events).drop_duplicates(subset=["code", "type"])
+        if not listing_events.empty:
+            events_df = listing_events.drop_duplicates(subset=["code", "type"])
             self.cm.update_listing_history(events_df)
 
     def reconstruct_name_history(self, code: str) -> pd.DataFrame:
         """
         【Identity Sovereignty】カタログデータから特定の銘柄の社名変更履歴を決定論的に再構成。
         """
-        if self.cm.catalog_df.empty:
+        return self.reconstruct_name_histories([code])
+
+    def reconstruct_name_histories(self, codes) -> pd.DataFrame:
+        """
+        【Identity Sovereignty】複数銘柄の社名変更履歴をカタログから一括で再構成。
+        銘柄ごとにカタログ全体を走査せず、isin による 1 回の抽出と groupby で遷移を検知する。
+        """
+        catalog_df = self.cm.catalog_df
+        if catalog_df.empty or "company_name" not in catalog_df.columns:
             return pd.DataFrame()
 
-        # 1. 該当コードの書類を抽出し、提出日時順にソート
-        stock_docs = self.cm.catalog_df[self.cm.catalog_df["code"] == code].copy()
+        # 1. 対象コードの書類を一括抽出し、銘柄・提出日時順にソート
+        stock_docs = catalog_df.loc[
+            catalog_df["code"].isin(set(codes)) & catalog_df["company_name"].notna(),
+            ["code", "company_name", "submit_at"],
+        ]
+        stock_docs = stock_docs[stock_docs["company_name"].astype(str) != ""]
         if stock_docs.empty:
             return pd.DataFrame()
+        stock_docs = stock_docs.sort_values(["code", "submit_at"], kind="stable")
+
+        # 2. 漢字名の正規化 (株), (有) 等の除去
+        names = stock_docs["company_name"].astype(str)
+        for noise in COMPANY_NAME_NOISE:
+            names = names.str.replace(noise, "", regex=False)
+        names = names.str.strip()
+
+        # 3. 同一銘柄内で直前の社名と異なる行を遷移として検知
+        prev_names = names.groupby(stock_docs["code"], sort=False).shift()
+        changed = prev_names.notna() & (prev_names != "") & (names != prev_names)
+        if not changed.any():
+            return pd.DataFrame()
 
-        stock_docs.sort_values("submit_at", ascending=True, inplace=True)
-
-        # 2. 社名の遷移を検知
-        history = []
-        last_name = None
-        for _, row in stock_docs.iterrows():
-            curr_name = row.get("company_name")
-            if not curr_name or pd.isna(curr_name):
-                continue
-            
-            # 漢字名の正規化 (株), (有) 等の除去
-            curr_name = self.normalize_company_name(curr_name)
-
-            if last_name and curr_name != last_name:
-                history.append({
-                    "code": code,
-                    "old_name": last_name,
-                    "new_name": curr_name,
-                    "change_date": str(row["submit_at"])[:10]
-                })
-            last_name = curr_name
-
-        return pd.DataFrame(history)
+        return pd.DataFrame(
+            {
+                "code": stock_docs["code"][changed].to_numpy(),
+                "old_name": prev_names[changed].to_numpy(),
+                "new_name": names[changed].to_numpy(),
+                "change_date": stock_docs["submit_at"][changed].astype(str).str[:10].to_numpy(),
+            }
+        )
 
     def normalize_company_name(self, name: str) -> str:
         """社名から法的形態の表記(株)などを除去し、純粋な商号を抽出"""
         if not name:
             return name
-        for noise in ["株式会社", "有限会社", "合同会社", "（株）", "(株)", "（有）", "(有)"]:
+        for noise in COMPANY_NAME_NOISE:
             name = name.replace(noise, "")
         return name.strip()
@@ -1,23 +1,28 @@
 import json
+import os
 import zipfile
 import shutil
 import traceback
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
 
 import pandas as pd
 from loguru import logger
 
 from data_engine.core.config import ARIA_SCOPE, CONFIG, HF_WARNING_THRESHOLD, RAW_DIR, TEMP_DIR
 from data_engine.core.network_utils import patch_all_networking
-from data_engine.core.utils import normalize_code, parse_datetime
+from data_engine.core.utils import edinet_partitions, normalize_code, parse_datetime
 from data_engine.engines.filtering_engine import FilteringEngine, ProcessVerdict, SkipReason
 from data_engine.engines.parsing.edinet.fs_tbl import get_fs_tbl
 
 # 設定 (SSOT から取得)
 PARALLEL_WORKERS = CONFIG.PARALLEL_WORKERS
 BATCH_PARALLEL_SIZE = CONFIG.BATCH_PARALLEL_SIZE
+BIN_WRITE_WORKERS = CONFIG.BIN_WRITE_WORKERS
+# ZIP 展開のスレッド数 (zlib 展開・書き込み中は GIL が解放される)
+EXTRACT_WORKERS = CONFIG.EXTRACT_WORKERS
 RAW_BASE_DIR = RAW_DIR
 
 
@@ -25,6 +30,40 @@ RAW_BASE_DIR = RAW_DIR
 
 _worker_acc_cache = {}
 
+
+def _extract_members(raw_zip, extract_dir: Path, members: list):
+    """ZipFile はスレッド間で共有せず、スレッドごとに開き直して展開する"""
+    with zipfile.ZipFile(str(raw_zip)) as zf:
+        for member in members:
+            zf.extract(member, extract_dir)
+
+
+def _member_target(extract_dir: Path, member: str) -> Path:
+    """ZipFile.extract と同じ規則 (ドライブ・絶対パス・'..' の除去) でメンバーの展開先を求める"""
+    arcname = member.replace("/", os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    parts = [x for x in arcname.split(os.path.sep) if x not in ("", os.path.curdir, os.path.pardir)]
+    return extract_dir.joinpath(*parts)
+
+
+def extract_zip_members(raw_zip, extract_dir: Path, members: list):
+    """指定メンバーをスレッドプールで並列に展開する"""
+    # 展開先ディレクトリを事前に作成し、スレッド間の makedirs 競合を防ぐ
+    # (zf.extract が実際に書き込むサニタイズ済みパスに合わせ、extract_dir 外には作らない)
+    for member in members:
+        target = _member_target(extract_dir, member)
+        (target if member.endswith("/") else target.parent).mkdir(parents=True, exist_ok=True)
+
+    batches = [members[i::EXTRACT_WORKERS] for i in range(EXTRACT_WORKERS) if members[i::EXTRACT_WORKERS]]
+    if len(batches) <= 1:
+        _extract_members(raw_zip, extract_dir, members)
+        return
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        list(executor.map(partial(_extract_members, raw_zip, extract_dir), batches))
+
+
 def parse_worker(args):
     """並列処理用ワーカー関数"""
     docid, row, acc_obj, raw_zip = args
@@ -47,9 +86,8 @@ def parse_worker(args):
         (extract_dir / "XBRL" / "PublicDoc").mkdir(parents=True, exist_ok=True)
 
         with zipfile.ZipFile(str(raw_zip)) as zf:
-            for member in zf.namelist():
-                if "PublicDoc" in member or "AuditDoc" in member:
-                    zf.extract(member, extract_dir)
+            members = [m for m in zf.namelist() if "PublicDoc" in m or "AuditDoc" in m]
+        extract_zip_members(raw_zip, extract_dir, members)
 
         df = get_fs_tbl(
             account_list_common_obj=acc_obj,
@@ -68,10 +106,10 @@ def parse_worker(args):
                 df["code"] = None
 
             df["submitDateTime"] = row.get("submitDateTime", "")
-            for col in df.columns:
-                if df[col].dtype == "object":
-                    df[col] = df[col].astype(str)
-                    
+            obj_cols = df.select_dtypes(include="object").columns
+            if len(obj_cols) > 0:
+                df[obj_cols] = df[obj_cols].astype(str)
+
             # 【工学的主権】全てのオブジェクト列に対し、不適切なセンチネル値を NULL に統一
             # これにより「-」や「None」文字列が不必要に保存されるのを防ぐ
             df = df.replace({"-": None, "None": None, "nan": None, "NaN": None})
@@ -121,8 +159,10 @@ def parse_worker(args):
         logger.error(f"解析例外: {docid}\n{err_detail}")
         return docid, None, f"{str(e)}", None
     finally:
-        if extract_dir.exists():
+        try:
             shutil.rmtree(extract_dir)
+        except FileNotFoundError:
+            pass
 
 
 class WorkerEngine:
@@ -168,6 +208,40 @@ class WorkerEngine:
         if hierarchy.get(new_status, 99) < hierarchy.get(current, 99):
             record["processed_status"] = new_status
 
+    def _save_bin_deltas(self, jobs) -> set:
+        """
+        Bin 単位のデルタ書き込みを並列実行し、失敗した Bin の集合を返す。
+        各ジョブは (bin, master_type) ごとに別ファイルへ書き込むため、ファイル単位の直列性を保ったまま
+        Bin 間の書き込みを並列化できる (Parquet エンコードは GIL を解放する)。
+        """
+        failed = set()
+        max_workers = max(1, min(BIN_WRITE_WORKERS, len(jobs)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.merger.merge_and_upload,
+                    b_val,
+                    m_type,
+                    df,
+                    worker_mode=True,
+                    catalog_manager=self.catalog,
+                    run_id=self.run_id,
+                    chunk_id=self.chunk_id,
+                    defer=True,
+                ): b_val
+                for b_val, m_type, df in jobs
+            }
+            for f in as_completed(futures):
+                b_val = futures[f]
+                try:
+                    ok = f.result()
+                except Exception as e:
+                    logger.error(f"Bin書き込み失敗: bin={b_val} - {e}")
+                    ok = False
+                if not ok:
+                    failed.add(b_val)
+        return failed
+
     def run(self):
         """Workerモード (デフォルト): データの取得・解析・保存のパイプラインを実行する"""
         mode_label = "Discovery" if self.args.list_only else "Worker"
@@ -326,7 +400,10 @@ class WorkerEngine:
             "parsing_failure": 0,
         }
 
-        for row in all_meta:
+        # 保存先パーティションは日時列から一括で導出する (行ごとの日時パースを避ける)
+        partitions = edinet_partitions(pd.Series([row.get("submitDateTime") for row in all_meta], dtype=object))
+
+        for row, partition in zip(all_meta, partitions, strict=True):
             doc_id = row.get("docID")
             if target_ids and doc_id not in target_ids:
                 continue
@@ -374,16 +451,8 @@ class WorkerEngine:
                 # SAVE_RAW 等の「保存のみ」
                 logger.info(f"[Saved  ] {log_msg}")
 
-            submit_date = parse_datetime(row["submitDateTime"])
-            # ... (ディレクトリ作成ロジックは維持)
-            if submit_date:
-                save_dir = (
-                    RAW_BASE_DIR
-                    / "edinet"
-                    / f"year={submit_date.year}"
-                    / f"month={submit_date.month:02d}"
-                    / f"day={submit_date.day:02d}"
-                )
+            if partition is not None:
+                save_dir = RAW_BASE_DIR / "edinet" / partition
             else:
                 logger.warning(f"Unparseable submitDateTime '{row['submitDateTime']}' for {doc_id}. Saving to unknown.")
                 save_dir = RAW_BASE_DIR / "edinet" / "unknown"
@@ -583,8 +652,10 @@ class WorkerEngine:
                     worker_stats["parsing_failure"] += 1
                     continue
                 finally:
-                    if detect_dir.exists():
+                    try:
                         shutil.rmtree(detect_dir)
+                    except FileNotFoundError:
+                        pass
             else:
                 worker_stats["metadata_saved"] += 1
                 if verdict == ProcessVerdict.SAVE_RAW:
@@ -595,17 +666,25 @@ class WorkerEngine:
                     worker_stats["parsing_failure"] += 1
 
         # HF 警告
-        checked_dirs = set()
-        for row in all_meta:
-            sd = parse_datetime(row.get("submitDateTime", ""))
-            if not sd:
+        # 対象日ディレクトリを先にユニーク化し、親 (month=) ディレクトリを 1 回ずつ走査して存在判定する
+        # (パーティション文字列は保存時に導出済みのものを再利用し、Path の結合はユニークな日付ごとに 1 回だけ行う)
+        day_dirs = {RAW_BASE_DIR / "edinet" / partition for partition in set(partitions.dropna())}
+
+        present_by_parent = {}
+        for day_dir in sorted(day_dirs):
+            parent = day_dir.parent
+            if parent not in present_by_parent:
+                try:
+                    with os.scandir(parent) as it:
+                        present_by_parent[parent] = {e.name for e in it if e.is_dir()}
+                except FileNotFoundError:
+                    present_by_parent[parent] = set()
+            if day_dir.name not in present_by_parent[parent]:
                 continue
-            day_dir = RAW_BASE_DIR / "edinet" / f"year={sd.year}" / f"month={sd.month:02d}" / f"day={sd.day:02d}"
-            if day_dir not in checked_dirs and day_dir.exists():
-                checked_dirs.add(day_dir)
-                file_count = sum(1 for _ in day_dir.iterdir())
-                if file_count > HF_WARNING_THRESHOLD:
-                    logger.warning(f"⚠️ HFフォルダファイル数警告: {day_dir.name} に {file_count} ファイル")
+            with os.scandir(day_dir) as it:
+                file_count = sum(1 for _ in it)
+            if file_count > HF_WARNING_THRESHOLD:
+                logger.warning(f"⚠️ HFフォルダファイル数警告: {day_dir.name} に {file_count} ファイル")
 
         if target_ids:
             missing_ids = set(target_ids) - found_target_ids
@@ -674,54 +753,27 @@ class WorkerEngine:
         processed_df = pd.DataFrame(processed_infos)
         if not processed_df.empty:
             processed_df["bin"] = processed_df["docID"].apply(lambda did: potential_catalog_records[did]["bin_id"])
-            bins = processed_df["bin"].unique()
-
-            if all_quant_dfs:
+            # docID -> bin の対応表により、数値・テキストの各フレームを 1 パスで Bin 分割する
+            docid_to_bin = processed_df.set_index("docID")["bin"].to_dict()
+            write_jobs = []
+            for label, m_type, dfs in (
+                ("Quant", "financial_values", all_quant_dfs),
+                ("Text", "qualitative_text", all_text_dfs),
+            ):
+                if not dfs:
+                    continue
                 try:
-                    full_quant_df = pd.concat(all_quant_dfs, ignore_index=True)
-                    for b_val in bins:
-                        bin_docids = processed_df[processed_df["bin"] == b_val]["docID"].tolist()
-                        sec_quant = full_quant_df[full_quant_df["docid"].isin(bin_docids)]
-                        if not sec_quant.empty:
-                            ok = self.merger.merge_and_upload(
-                                b_val,
-                                "financial_values",
-                                sec_quant,
-                                worker_mode=True,
-                                catalog_manager=self.catalog,
-                                run_id=self.run_id,
-                                chunk_id=self.chunk_id,
-                                defer=True,
-                            )
-                            if not ok:
-                                bin_failures.add(b_val)
-                                all_success = False
+                    full_df = pd.concat(dfs, ignore_index=True)
+                    for b_val, bin_df in full_df.groupby(full_df["docid"].map(docid_to_bin), sort=False):
+                        write_jobs.append((b_val, m_type, bin_df))
                 except Exception as e:
-                    logger.error(f"Quant merge failed: {e}")
+                    logger.error(f"{label} merge failed: {e}")
                     all_success = False
 
-            if all_text_dfs:
-                try:
-                    full_text_df = pd.concat(all_text_dfs, ignore_index=True)
-                    for b_val in bins:
-                        bin_docids = processed_df[processed_df["bin"] == b_val]["docID"].tolist()
-                        sec_text = full_text_df[full_text_df["docid"].isin(bin_docids)]
-                        if not sec_text.empty:
-                            ok = self.merger.merge_and_upload(
-                                b_val,
-                                "qualitative_text",
-                                sec_text,
-                                worker_mode=True,
-                                catalog_manager=self.catalog,
-                                run_id=self.run_id,
-                                chunk_id=self.chunk_id,
-                                defer=True,
-                            )
-                            if not ok:
-                                bin_failures.add(b_val)
-                                all_success = False
-                except Exception as e:
-                    logger.error(f"Text merge failed: {e}")
+            if write_jobs:
+                failed_bins = self._save_bin_deltas(write_jobs)
+                if failed_bins:
+                    bin_failures |= failed_bins
                     all_success = False
 
         # 【Transactional Integrity】解析済み (parsed) レコードを成功 (success) に昇格させる
@@ -107,8 +107,10 @@ def run_backfill(catalog: CatalogManager, run_id: str, limit: int = None):
             logger.error(f"Taxonomy check failed for {doc_id}: {e}")
             record["processed_status"] = "failure"
         finally:
-            if detect_dir.exists():
+            try:
                 shutil.rmtree(detect_dir)
+            except FileNotFoundError:
+                pass
 
     # 4. Execute parsing
     all_quant_dfs = []
@@ -1,18 +1,121 @@
 import argparse
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
 
 import pandas as pd
+import pyarrow.parquet as pq
+from huggingface_hub import snapshot_download
 from loguru import logger
 
 from data_engine.catalog_manager import CatalogManager
 from data_engine.core.config import CONFIG
 from data_engine.core.models import SCHEMA_INDEX
 from data_engine.core.network_utils import patch_all_networking
-from data_engine.engines.market_engine import MarketDataEngine
+from data_engine.engines.market_engine import INDEX_HISTORY_COLS, MarketDataEngine
 
 # グローバル設定は CONFIG インスタンス化時に適用済み
 
+# 前日Snapshot / History の読込対象列 (差分生成・追記に必要な列のみ)
+SNAPSHOT_COLS = ["code", "weight"]
+HISTORY_COLS = INDEX_HISTORY_COLS
+
+# 指数処理の並列数 (SSOT から取得)
+INDEX_WORKERS = CONFIG.INDEX_WORKERS
+
+
+def _read_parquet_columns(path, columns: list) -> pd.DataFrame:
+    """必要な列のみを pyarrow で射影し、Arrow バックエンドの DataFrame として読み込む (存在しない列は無視)"""
+    available = set(pq.read_schema(path).names)
+    return pq.read_table(path, columns=[c for c in columns if c in available]).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _process_index(
+    index_name: str,
+    engine: MarketDataEngine,
+    catalog: CatalogManager,
+    target_date: str,
+    prev_date: str,
+    data_path: Path,
+    temp_dir: Path,
+    stage_lock: threading.Lock,
+):
+    """1指数分の取得・Snapshot保存・イベント差分の生成 (指数間で独立しているためスレッド並列で実行)"""
+    prev_year = prev_date[:4]
+    prev_fname = f"data_{prev_date.replace('-', '')}.parquet"
+
+    logger.info(f"--- Processing {index_name} ---")
+    # History は日次の追記専用ファイルとして保存 (既存履歴の再ダウンロード・再書込を行わない)
+    # path: master/indices/{index}/history/year={YYYY}/events_{YYYYMMDD}.parquet
+    hist_path = (
+        f"master/indices/{index_name}/history/year={target_date[:4]}/events_{target_date.replace('-', '')}.parquet"
+    )
+    local_hist = data_path / f"{index_name}_events_{target_date}.parquet"
+    try:
+        # A. Fetch Latest Data
+        df_new = engine.fetch_index_data(index_name)
+        # 【修正】Nikkei High Dividend 50 等、銘柄数が少ない指数を考慮して閾値を 40 に緩和
+        if df_new.empty or len(df_new) < 40:
+            logger.error(f"取得データが少なすぎます ({len(df_new)} rows). スキップします。")
+            return
+
+        # Clean df_new just in case
+        if "rec" in df_new.columns:
+            df_new.drop(columns=["rec"], inplace=True)
+
+        # B. Save Snapshot (Year partitioning)
+        # path: master/indices/{index}/constituents/year={YYYY}/data_{YYYYMMDD}.parquet
+        year = target_date[:4]
+        snap_path = f"master/indices/{index_name}/constituents/year={year}/data_{target_date.replace('-', '')}.parquet"
+        local_snap = data_path / f"{index_name}_{target_date}.parquet"
+        # 【Phase 3 注記】指数構成銘柄の動的カラム構成のため、固定スキーマ不適用
+        df_new.to_parquet(local_snap, index=False, compression="zstd")
+
+        with stage_lock:
+            catalog.hf.upload_raw(local_snap, snap_path, defer=True)
+        logger.info(f"Snapshot staged: {snap_path}")
+
+        # C. Update History (Events)
+        # 前日のSnapshotを探す (一括ダウンロード済みのローカルファイルを参照)
+        try:
+            prev_path = f"master/indices/{index_name}/constituents/year={prev_year}/{prev_fname}"
+            downloaded_path = temp_dir / prev_path
+            if downloaded_path.exists():
+                # 【重要】必要列のみを読み込むため、既存データの汚染列 (rec 等) は持ち込まれない
+                df_old = _read_parquet_columns(downloaded_path, SNAPSHOT_COLS)
+                logger.info(f"Loaded Previous Snapshot: {prev_date}")
+            else:
+                logger.warning(f"Previous Snapshot not found in Repo ({prev_date}): {prev_path}")
+                df_old = pd.DataFrame(columns=SNAPSHOT_COLS)
+
+            # Diff生成
+            diff_events = pd.DataFrame()
+            if not df_old.empty:
+                diff_events = engine.generate_index_diff(index_name, df_old, df_new, target_date)
+            else:
+                logger.info(f"Initial run for {index_name}. Baseline established.")
+
+            if not diff_events.empty:
+                # 当日分のイベントのみを書き出す (重複排除は読込時に実施)
+                df_events = diff_events[HISTORY_COLS].drop_duplicates()
+
+                # Save (Deferred)
+                df_events.to_parquet(local_hist, index=False, compression="zstd", schema=SCHEMA_INDEX)
+                with stage_lock:
+                    catalog.hf.upload_raw(local_hist, hist_path, defer=True)
+                logger.info(f"History staged: {hist_path}")
+            else:
+                logger.info(f"No changes detected for {index_name}")
+
+        except Exception as e_hist:
+            logger.error(f"Failed to update history for {index_name}: {e_hist}")
+
+    except Exception as e:
+        logger.error(f"{index_name} 更新失敗: {e}")
+
 
 def run_market_pipeline(target_date: str, mode: str = "all"):
     logger.info(f"=== Market Data Pipeline Started (Target Date: {target_date}) ===")
@@ -57,129 +160,40 @@ def run_market_pipeline(target_date: str, mode: str = "all"):
             # 動的に全戦略を取得
             indices = list(engine.strategies.keys())
 
-            for index_name in indices:
-                logger.info(f"--- Processing {index_name} ---")
-                # 名前解決の便宜上の初期化 (破損防止のためカラムを明示)
-                history_cols = ["date", "index_name", "code", "type", "old_value", "new_value"]
-                df_hist_current = pd.DataFrame(columns=history_cols)
-                hist_path = f"master/indices/{index_name}/history.parquet"
-                local_hist = data_path / f"{index_name}_history.parquet"
-                try:
-                    # A. Fetch Latest Data
-                    df_new = engine.fetch_index_data(index_name)
-                    # 【修正】Nikkei High Dividend 50 等、銘柄数が少ない指数を考慮して閾値を 40 に緩和
-                    if df_new.empty or len(df_new) < 40:
-                        logger.error(f"取得データが少なすぎます ({len(df_new)} rows). スキップします。")
-                        continue
-
-                    # Clean df_new just in case
-                    if "rec" in df_new.columns:
-                        df_new.drop(columns=["rec"], inplace=True)
-
-                    # B. Save Snapshot (Year partitioning)
-                    # path: master/indices/{index}/constituents/year={YYYY}/data_{YYYYMMDD}.parquet
-                    year = target_date[:4]
-                    snap_path = (
-                        f"master/indices/{index_name}/constituents/"
-                        f"year={year}/data_{target_date.replace('-', '')}.parquet"
-                    )
-                    local_snap = data_path / f"{index_name}_{target_date}.parquet"
-                    # 【Phase 3 注記】指数構成銘柄の動的カラム構成のため、固定スキーマ不適用
-                    df_new.to_parquet(local_snap, index=False, compression="zstd")
-
-                    catalog.hf.upload_raw(local_snap, snap_path, defer=True)
-                    logger.info(f"Snapshot staged: {snap_path}")
-
-                    # C. Update History (Events)
-                    # 前日のSnapshotを探す
-                    try:
-                        dt_target = datetime.strptime(target_date, "%Y-%m-%d")
-                        dt_prev = dt_target - timedelta(days=1)
-                        prev_date = dt_prev.strftime("%Y-%m-%d")  # "YYYY-MM-DD"
-                        prev_year = prev_date[:4]
-                        prev_fname = f"data_{prev_date.replace('-', '')}.parquet"
-                        prev_path = f"master/indices/{index_name}/constituents/year={prev_year}/{prev_fname}"
-
-                        # 前日Snapshotのロード (Catalog経由でダウンロード)
-                        try:
-                            from huggingface_hub import hf_hub_download
-
-                            hf_hub_download(
-                                repo_id=CONFIG.HF_REPO,
-                                filename=prev_path,
-                                token=CONFIG.HF_TOKEN,
-                                local_dir=str(temp_dir),  # ディレクトリ指定
-                                local_dir_use_symlinks=False,
-                            )
-                            downloaded_path = temp_dir / prev_path
-                            if downloaded_path.exists():
-                                df_old = pd.read_parquet(downloaded_path)
-                                # 【重要】既存データからの汚染除去
-                                if "rec" in df_old.columns:
-                                    df_old.drop(columns=["rec"], inplace=True)
-                                logger.info(f"Loaded Previous Snapshot: {prev_date}")
-                            else:
-                                logger.warning(f"Previous Snapshot file not found at local: {downloaded_path}")
-                                df_old = pd.DataFrame(columns=["code", "weight"])
-
-                        except Exception as e_dl:
-                            logger.warning(f"Previous Snapshot not found in Repo ({prev_date}): {e_dl}")
-                            df_old = pd.DataFrame(columns=["code", "weight"])
-
-                        # Diff生成
-                        diff_events = pd.DataFrame()
-                        if not df_old.empty:
-                            diff_events = engine.generate_index_diff(index_name, df_old, df_new, target_date)
-                        else:
-                            logger.info(f"Initial run for {index_name}. Baseline established.")
-
-                        if not diff_events.empty:
-                            # Historyファイルのロードと追記
-                            # master/indices/{index_name}/history.parquet
-
-                            # 既存History取得
-                            try:
-                                hf_hub_download(
-                                    repo_id=CONFIG.HF_REPO,
-                                    filename=hist_path,
-                                    token=CONFIG.HF_TOKEN,
-                                    local_dir=str(temp_dir),
-                                    local_dir_use_symlinks=False,
-                                )
-                                dl_hist_path = temp_dir / hist_path
-                                if dl_hist_path.exists():
-                                    df_hist_current = pd.read_parquet(dl_hist_path)
-                                    # 【重要】既存データからの汚染除去
-                                    if "rec" in df_hist_current.columns:
-                                        df_hist_current.drop(columns=["rec"], inplace=True)
-                                else:
-                                    df_hist_current = pd.DataFrame(columns=history_cols)
-                            except Exception:
-                                df_hist_current = pd.DataFrame(columns=history_cols)
-
-                            # Merge
-                            df_hist_new = pd.concat([df_hist_current, diff_events], ignore_index=True).drop_duplicates()
-                            # 【重要】保存前最終チェック
-                            if "rec" in df_hist_new.columns:
-                                df_hist_new.drop(columns=["rec"], inplace=True)
-
-                            # Save (Deferred)
-                            df_hist_new.to_parquet(local_hist, index=False, compression="zstd", schema=SCHEMA_INDEX)
-                            catalog.hf.upload_raw(local_hist, hist_path, defer=True)
-                            logger.info(f"History staged: {index_name}")
-                        elif df_hist_current.empty:
-                            # Save (Deferred)
-                            df_hist_current.to_parquet(local_hist, index=False, compression="zstd", schema=SCHEMA_INDEX)
-                            catalog.hf.upload_raw(local_hist, hist_path, defer=True)
-                            logger.info(f"History initialized: {index_name}")
-                        else:
-                            logger.info(f"No changes detected for {index_name}")
-
-                    except Exception as e_hist:
-                        logger.error(f"Failed to update history for {index_name}: {e_hist}")
-
-                except Exception as e:
-                    logger.error(f"{index_name} 更新失敗: {e}")
+            # 前日Snapshotのパス (全指数共通の日付)
+            dt_prev = datetime.strptime(target_date, "%Y-%m-%d") - timedelta(days=1)
+            prev_date = dt_prev.strftime("%Y-%m-%d")  # "YYYY-MM-DD"
+            prev_year = prev_date[:4]
+            prev_fname = f"data_{prev_date.replace('-', '')}.parquet"
+
+            # 全指数の前日Snapshot を一括ダウンロード (指数ごとの往復を排除)
+            prefetch_patterns = [f"master/indices/{idx}/constituents/year={prev_year}/{prev_fname}" for idx in indices]
+            try:
+                snapshot_download(
+                    repo_id=CONFIG.HF_REPO,
+                    repo_type="dataset",
+                    token=CONFIG.HF_TOKEN,
+                    local_dir=str(temp_dir),
+                    allow_patterns=prefetch_patterns,
+                    max_workers=8,
+                )
+            except Exception as e_dl:
+                logger.warning(f"Previous Snapshot の一括取得に失敗しました: {e_dl}")
+
+            # 指数ごとの処理はネットワーク I/O 主体で互いに独立しているため並列実行
+            # (コミットバッファへの追加のみロックで直列化)
+            process = partial(
+                _process_index,
+                engine=engine,
+                catalog=catalog,
+                target_date=target_date,
+                prev_date=prev_date,
+                data_path=data_path,
+                temp_dir=temp_dir,
+                stage_lock=threading.Lock(),
+            )
+            with ThreadPoolExecutor(max_workers=max(1, min(INDEX_WORKERS, len(indices)))) as pool:
+                list(pool.map(process, indices))
 
         # Final Push
         if catalog.push_commit(f"Market Data Update: {target_date}"):
@@ -190,12 +204,13 @@ def run_market_pipeline(target_date: str, mode: str = "all"):
 
     finally:
         # 一時ファイルの削除
-        if temp_dir.exists():
-            try:
-                shutil.rmtree(temp_dir)
-                logger.info("Temporary files cleaned up.")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp dir: {e}")
+        try:
+            shutil.rmtree(temp_dir)
+            logger.info("Temporary files cleaned up.")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to cleanup temp dir: {e}")
 
 
 if __name__ == "__main__":
@@ -26,6 +26,9 @@ from data_engine.core import utils
 # ARIA モジュール
 from data_engine.core.models import CatalogRecord, ListingEvent, StockMasterRecord
 
+# 指数イベント種別 (MarketDataEngine.generate_index_diff が生成する値)
+INDEX_EVENT_TYPES = ["ADD", "REMOVE", "UPDATE"]
+
 
 class DataReconciliationEngine:
     def __init__(self, hf_repo: str, hf_token: str, data_path: Path, repair: bool = False):
@@ -655,27 +658,42 @@ class DataReconciliationEngine:
         """[Layer 5] 指数履歴の不変性と整合性を検証"""
         logger.info("--- [Layer 5] Indexing Reconciliation ---")
         try:
-            from data_engine.core.models import ARIA_SCHEMAS
+            import tempfile
 
-            # モデル定義に準拠した正しいキー名 ("indices") を使用
-            key = "indices"
-            df = None
-            try:
-                df = self.cm.hf.load_parquet(key)
-            except Exception as e:
-                logger.error(f"Index History is corrupted: {e}")
-                if self.repair:
-                    df = self._attempt_file_rollback(key)
+            from huggingface_hub import snapshot_download
 
-            if df is not None:
-                # 最小限のカラム検証
-                schema = ARIA_SCHEMAS.get(key)
-                if schema and set(df.columns) != set(schema.names):
-                    self._report_anomaly("Layer5_Indexing", "Schema drift in history.parquet")
-                    if self.repair:
-                        self.cm.hf.save_and_upload(key, df, defer=True)
-                else:
-                    logger.info("✅ Index History is healthy.")
+            from data_engine.engines.market_engine import index_history_patterns, load_index_history
+
+            indices = list(self.cm.market.strategies.keys())
+            with tempfile.TemporaryDirectory(prefix="aria_index_audit_") as tmp_dir:
+                # 全指数の履歴 (日次の追記ファイル + 旧形式の history.parquet) を一括ダウンロード
+                snapshot_download(
+                    repo_id=self.hf_repo,
+                    repo_type="dataset",
+                    token=self.hf_token,
+                    allow_patterns=[p for idx in indices for p in index_history_patterns(idx)],
+                    local_dir=tmp_dir,
+                )
+
+                for index_name in indices:
+                    # 日次ファイルは追記専用で書き換えないため、異常は報告のみとし自動修復は行わない
+                    try:
+                        df = load_index_history(Path(tmp_dir) / "master" / "indices" / index_name)
+                    except Exception as e:
+                        self._report_anomaly(
+                            "Layer5_Indexing", f"Index History is unreadable: {index_name}", details=str(e)
+                        )
+                        continue
+
+                    invalid = ~df["type"].isin(INDEX_EVENT_TYPES) | df["index_name"].ne(index_name).fillna(True)
+                    if invalid.any():
+                        self._report_anomaly(
+                            "Layer5_Indexing",
+                            f"Found {int(invalid.sum())} invalid events in {index_name} history",
+                            details=df.loc[invalid].head(20).astype(str).to_dict("records"),
+                        )
+                    else:
+                        logger.info(f"✅ Index History is healthy: {index_name} ({len(df)} events)")
         except Exception as e:
             self._report_anomaly("Layer5_Indexing", f"Indexing check failed: {e}")
 
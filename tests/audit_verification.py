@@ -1,18 +1,17 @@
-from pathlib import Path
-import shutil
 import sys
+import tempfile
+from pathlib import Path
 from unittest.mock import patch
 
 import pandas as pd
 
 # Define paths
-root = Path("/Users/yoshi_dai/repos/ARIA").resolve()
+root = Path(__file__).resolve().parents[1]
 sys.path.append(str(root))
-sys.path.append(str(root / "data_engine"))
 
 try:
     from data_engine.catalog_manager import CatalogManager
-    from data_engine.models import EdinetCodeRecord
+    from data_engine.core.models import EdinetCodeRecord
 
     print("DEBUG: Successfully imported CatalogManager and models")
 except ImportError as e:
@@ -20,11 +19,9 @@ except ImportError as e:
     sys.exit(1)
 
 
-def test_audit_logic():
-    DATA_PATH = root / "tests" / "temp_audit_test"
-    if DATA_PATH.exists():
-        shutil.rmtree(DATA_PATH)
-    DATA_PATH.mkdir(parents=True, exist_ok=True)
+def test_audit_logic(tmp_path: Path):
+    # テストごとに独立した一時ディレクトリを使用 (削除・再作成や並列実行時の競合を避ける)
+    DATA_PATH = tmp_path
 
     # Mock environment
     hf_repo = None
@@ -58,57 +55,52 @@ def test_audit_logic():
         return mock_paths.get(filename, "missing")
 
     with patch.object(CatalogManager, "sync_edinet_code_lists", return_value=({}, {})):
-        with patch.object(CatalogManager, "_discover_edinet_code", return_value=("E00001", "1234567890123")):
-            with patch("data_engine.catalog_manager.hf_hub_download", side_effect=side_effect):
-                print("\n--- Phase 1: Testing Listed Scope ---")
-                catalog = CatalogManager(hf_repo, hf_token, DATA_PATH, scope="Listed")
-
-                test_data = pd.DataFrame(
-                    [
-                        {
-                            "code": "1332",
-                            "company_name": "Nissui",
-                            "sector_jpx_33": "-",
-                            "is_consolidated": "有",
-                            "is_active": True,
-                        }
-                    ]
-                )
-                catalog.update_stocks_master(test_data)
-
-                catalog.edinet_codes = {
-                    "E00004": EdinetCodeRecord(
-                        edinet_code="E00004", submitter_name="Kaneko", is_listed="上場", sec_code="1376"
-                    )
-                }
-                catalog._update_master_from_edinet_codes()
-
-                print("\n--- Phase 2: Testing Unlisted Scope ---")
-                catalog_un = CatalogManager(hf_repo, hf_token, DATA_PATH, scope="Unlisted")
-                catalog_un.edinet_codes = {
-                    "E41521": EdinetCodeRecord(
-                        edinet_code="E41521", submitter_name="Haga", is_listed="非上場", sec_code=None
-                    ),
-                    "E00004": EdinetCodeRecord(
-                        edinet_code="E00004", submitter_name="Kaneko", is_listed="上場", sec_code="1376"
-                    ),
-                }
-                catalog_un._update_master_from_edinet_codes()
-
-                master_un = catalog_un.master_df
-                assert "E41521" in master_un["edinet_code"].values
-                assert "E00004" not in master_un["edinet_code"].values
-                print("PASS: Scope Filtering (Unlisted) Verified")
+        with patch("data_engine.storage.hf_storage.hf_hub_download", side_effect=side_effect):
+            print("\n--- Phase 1: Testing EDINET Code Bridging (JPX) ---")
+            catalog = CatalogManager(hf_repo, hf_token, DATA_PATH, scope="Listed", edinet=False)
+            # JPX レコードの EDINET コードは IdentityResolver.bridge_fill が証券コードから逆引きする
+            catalog.edinet_codes = {
+                "E00001": EdinetCodeRecord(edinet_code="E00001", company_name="Nissui", code="1332"),
+            }
+
+            test_data = pd.DataFrame(
+                [
+                    {
+                        "code": "1332",
+                        "company_name": "Nissui",
+                        "sector_jpx_33": "-",
+                        "is_consolidated": "有",
+                        "is_active": True,
+                    }
+                ]
+            )
+            catalog.update_stocks_master(test_data)
+
+            master = catalog.master_df.set_index("code")
+            assert master.loc["JP:13320", "edinet_code"] == "E00001"
+            print("PASS: EDINET Code Bridging Verified")
+
+            print("\n--- Phase 2: Testing Master Sync from EDINET Code List ---")
+            catalog.edinet_codes = {
+                "E41521": EdinetCodeRecord(edinet_code="E41521", company_name="Haga", is_listed_edinet="非上場"),
+                "E00004": EdinetCodeRecord(
+                    edinet_code="E00004", company_name="Kaneko", is_listed_edinet="上場", code="1376"
+                ),
+            }
+            catalog.reconciliation.update_master_from_edinet_codes()
+
+            master = catalog.master_df
+            assert {"E00001", "E00004", "E41521"} <= set(master["edinet_code"])
+            assert master.loc[master["edinet_code"] == "E00004", "code"].iloc[0] == "JP:13760"
+            print("PASS: Master Sync Verified")
 
 
 if __name__ == "__main__":
     try:
-        test_audit_logic()
+        # pytest 外で実行する場合は tmp_path の代わりに一時ディレクトリを渡す (終了時に自動削除)
+        with tempfile.TemporaryDirectory(prefix="aria_audit_") as tmp_dir:
+            test_audit_logic(Path(tmp_dir))
         print("\n🎯 ALL AUDIT TESTS PASSED")
-        # Final cleanup encouraged
-        DATA_PATH = root / "tests" / "temp_audit_test"
-        if DATA_PATH.exists():
-            shutil.rmtree(DATA_PATH)
     except Exception as e:
         print(f"\n❌ TEST FAILED: {e}")
         sys.exit(1)
@@ -0,0 +1,65 @@
+"""
+pytest 共通フィクスチャ。
+HF Hub のモックとキャッシュ先をセッション単位で共有し、テストモジュールごとの再構築を避ける。
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fakes import FakeHfApi
+from huggingface_hub.utils import EntryNotFoundError
+
+_ORIGINAL_HF_HOME = os.environ.get("HF_HOME")
+
+
+def pytest_configure(config):
+    # huggingface_hub は import 時に HF_HOME を読むため、テストモジュールの収集前に固定する
+    # (実行間で共有される一時ディレクトリを使い、2 回目以降はキャッシュ済みの状態で動かす)
+    os.environ.setdefault("HF_HOME", str(Path(tempfile.gettempdir()) / "aria_pytest_hf"))
+
+
+def pytest_unconfigure(config):
+    # セッション終了時に HF_HOME を元の状態へ戻す
+    if _ORIGINAL_HF_HOME is None:
+        os.environ.pop("HF_HOME", None)
+    else:
+        os.environ["HF_HOME"] = _ORIGINAL_HF_HOME
+
+
+@pytest.fixture(scope="session")
+def mock_hf_api():
+    """HfApi をセッション単位で一度だけ FakeHfApi に差し替え、全テストで共有する"""
+    with (
+        patch("huggingface_hub.HfApi", FakeHfApi),
+        patch("data_engine.storage.hf_storage.HfApi", FakeHfApi),
+        patch("data_engine.engines.master_merger.HfApi", FakeHfApi),
+    ):
+        yield FakeHfApi
+
+
+@pytest.fixture(scope="session")
+def aria_data_path(tmp_path_factory) -> Path:
+    """テストセッションで共有する ARIA のデータディレクトリ (pytest が後始末する)"""
+    return tmp_path_factory.mktemp("aria_data")
+
+
+@pytest.fixture(scope="session")
+def catalog_manager(mock_hf_api, aria_data_path):
+    """HF リポジトリを空として扱う CatalogManager をセッション単位で一度だけ構築する"""
+    from data_engine.catalog_manager import CatalogManager
+
+    def _not_found(*args, filename=None, **kwargs):
+        raise EntryNotFoundError(f"Mocked 404 for {filename}")
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("data_engine.storage.hf_storage.hf_hub_download", _not_found)
+        yield CatalogManager(hf_repo="mock/repo", hf_token="mock_token", data_path=aria_data_path, edinet=False)
+
+
+@pytest.fixture(scope="session")
+def market_engine(catalog_manager):
+    """CatalogManager が保持する MarketDataEngine (セッションを共有)"""
+    return catalog_manager.market
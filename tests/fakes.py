@@ -0,0 +1,29 @@
+"""
+テスト用の軽量フェイク。
+MagicMock は属性アクセスのたびに子モックを生成するため、呼び出されるメソッドだけを持つ素朴なクラスで代替する。
+"""
+
+
+class FakeHfApi:
+    """HfApi のフェイク。アップロード・コミットは常に成功し、リポジトリは空として振る舞う"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def upload_file(self, *args, **kwargs):
+        return True
+
+    def upload_folder(self, *args, **kwargs):
+        return True
+
+    def create_commit(self, *args, **kwargs):
+        return True
+
+    def list_repo_files(self, *args, **kwargs):
+        return []
+
+    def list_repo_commits(self, *args, **kwargs):
+        return []
+
+    def get_paths_info(self, *args, **kwargs):
+        return []
@@ -2,10 +2,12 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
-# Add data_engine to sys.path
-sys.path.append(str(Path(__file__).parent.parent / "data_engine"))
+import pandas as pd
 
-from main import parse_datetime
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data_engine.core.utils import parse_datetime, parse_datetime_series
 
 
 def test_parse_datetime():
@@ -27,6 +29,20 @@ def test_parse_datetime():
             print(f"❌ Failed for {dt_str}: {e}")
             sys.exit(1)
 
+    # 不正な日付・書式は None
+    assert parse_datetime("2022-13-45 09:17") is None
+    assert parse_datetime("20221003") is None
+    assert parse_datetime("2022-10-03garbage") is None
+
+    # 時が 1 桁でも時刻まで解釈する
+    assert parse_datetime("2022-10-03 9:17") == datetime(2022, 10, 3, 9, 17)
+
+    # 一括版はスカラー版と同じ結果を返す
+    values = ["2022-10-03 09:17:45", "2022-10-03 09:17", "2022-10-03"]
+    parsed = parse_datetime_series(pd.Series(values))
+    assert list(parsed) == [parse_datetime(v) for v in values]
+    assert parse_datetime_series(pd.Series(["invalid"])).isna().all()
+
 
 if __name__ == "__main__":
     test_parse_datetime()
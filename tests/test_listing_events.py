@@ -0,0 +1,26 @@
+import pandas as pd
+
+
+def test_initial_listing_for_all(catalog_manager):
+    # 既存マスタが空なら、Active な銘柄はすべて LISTING
+    new_master = pd.DataFrame({"code": ["13010", "13320", "13760"], "is_active": [True, True, False]})
+    events = catalog_manager.reconciliation.lifecycle.detect_listing_events(new_master, pd.DataFrame())
+
+    assert list(events.columns) == ["code", "type", "event_date"]
+    assert sorted(events["code"]) == ["13010", "13320"]
+    assert (events["type"] == "LISTING").all()
+
+
+def test_only_new_codes_listing(catalog_manager):
+    # 既存銘柄は LISTING にならず、新規コードと Active→非Active の変化のみ検知する
+    current_master = pd.DataFrame({"code": ["13010", "13320"], "is_active": [True, True]})
+    new_master = pd.DataFrame({"code": ["13010", "13320", "13760"], "is_active": [True, False, True]})
+    events = catalog_manager.reconciliation.lifecycle.detect_listing_events(new_master, current_master)
+
+    assert dict(zip(events["code"], events["type"], strict=True)) == {"13760": "LISTING", "13320": "DELISTING"}
+
+
+def test_market_engine_shares_session(catalog_manager, market_engine):
+    # 全指数ストラテジーが 1 つのセッション (コネクションプール) を共有する
+    assert market_engine is catalog_manager.market
+    assert all(s.session is market_engine.session for s in market_engine.strategies.values())
@@ -1,58 +1,39 @@
 import sys
-from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 
-# Mocking constants
-RAW_BASE_DIR = Path("/tmp/aria_test/raw")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from data_engine.core.utils import normalize_codes  # noqa: E402
 
-def normalize_code(code: str) -> str:
-    """証券コードを 5 桁に正規化する (4桁なら末尾0付与、5桁なら維持)"""
-    if not code:
-        return ""
-    c = str(code).strip()
-    return c + "0" if len(c) == 4 else c
+# Mocking constants
+RAW_BASE_DIR = Path("/tmp/aria_test/raw")
 
 
 def test_sec_code_logic():
     print("--- Testing secCode Logic ---")
 
-    # Mock data
-    row_success = {"secCode": "1234", "submitDateTime": "2022-06-15 10:00:00"}
-    row_fail = {"secCode": None, "submitDateTime": "2022-06-15 10:00:00"}
-    row_5digit = {"secCode": "56780", "submitDateTime": "2022-06-15 10:00:00"}
-
-    # Mock DataFrame
-    df = pd.DataFrame({"dummy": [1, 2, 3]})
+    # Mock data: 4桁 / 欠損 / 5桁 を 1 列にまとめて一括で正規化する
+    df = pd.DataFrame(
+        [
+            {"secCode": "1234", "submitDateTime": "2022-06-15 10:00:00"},
+            {"secCode": None, "submitDateTime": "2022-06-15 10:00:00"},
+            {"secCode": "56780", "submitDateTime": "2022-06-15 10:00:00"},
+        ]
+    )
+    print(f"Testing codes: {df['secCode'].tolist()}")
+    df["code"] = normalize_codes(df["secCode"], nationality="JP")
+    print(f"DF Column:\n{df['code']}")
 
     # Case 1: Standard 4-digit code
-    print(f"Testing 4-digit code: {row_success['secCode']}")
-    sec_code_meta = row_success.get("secCode", "")
-    code_result = normalize_code(sec_code_meta) if sec_code_meta else "99990"
-    print(f"Result: {code_result}")
-    assert code_result == "12340", f"Expected 12340, got {code_result}"
-
-    # Case 2: 5-digit code
-    print(f"Testing 5-digit code: {row_5digit['secCode']}")
-    sec_code_meta = row_5digit.get("secCode", "")
-    code_result = normalize_code(sec_code_meta) if sec_code_meta else "99990"
-    print(f"Result: {code_result}")
-    assert code_result == "56780", f"Expected 56780, got {code_result}"
-
-    # Case 3: Missing code (Fall back to None - NULL Architecture)
-    print(f"Testing missing code: {row_fail['secCode']}")
-    sec_code_meta = row_fail.get("secCode")
-    # Logic simulation:
-    code_result = normalize_code(sec_code_meta) if (sec_code_meta and str(sec_code_meta).strip()) else None
-
-    print(f"Result: {code_result}")
-    assert code_result is None, f"Expected None, got {code_result}"
-
-    # Apply to DF (Simulation)
-    df["code"] = code_result
-    print(f"DF Column:\n{df['code']}")
+    assert df["code"].iloc[0] == "JP:12340", f"Expected JP:12340, got {df['code'].iloc[0]}"
+
+    # Case 2: Missing code (Fall back to None - NULL Architecture)
+    assert df["code"].iloc[1] is None, f"Expected None, got {df['code'].iloc[1]}"
+
+    # Case 3: 5-digit code
+    assert df["code"].iloc[2] == "JP:56780", f"Expected JP:56780, got {df['code'].iloc[2]}"
 
 
 def test_path_logic():
@@ -62,22 +43,16 @@ def test_path_logic():
         {"submitDateTime": "2024-01-01 10:00:00", "expected": "year=2024/month=01/day=01"},
     ]
 
-    for row in rows:
-        submit_date_str = row["submitDateTime"]
-        submit_date = datetime.strptime(submit_date_str, "%Y-%m-%d %H:%M:%S")
-
-        save_dir = (
-            RAW_BASE_DIR
-            / "edinet"
-            / f"year={submit_date.year}"
-            / f"month={submit_date.month:02d}"
-            / f"day={submit_date.day:02d}"
-        )
+    # 日時のパースとパス生成を列単位で一括実行
+    df = pd.DataFrame(rows)
+    submit_date = pd.to_datetime(df["submitDateTime"], format="%Y-%m-%d %H:%M:%S")
+    save_dirs = str(RAW_BASE_DIR) + "/edinet/" + submit_date.dt.strftime("year=%Y/month=%m/day=%d")
 
-        rel_path = str(save_dir).replace(str(RAW_BASE_DIR) + "/", "")
+    for submit_date_str, save_dir, expected in zip(df["submitDateTime"], save_dirs, df["expected"], strict=True):
+        rel_path = save_dir.replace(str(RAW_BASE_DIR) + "/", "")
         # Remove "edinet/" prefix for comparison if needed, or check full end
         print(f"Date: {submit_date_str} -> Path: {rel_path}")
-        assert f"edinet/{row['expected']}" in str(save_dir), f"Expected {row['expected']} in {save_dir}"
+        assert f"edinet/{expected}" in save_dir, f"Expected {expected} in {save_dir}"
 
 
 if __name__ == "__main__":
@@ -1,39 +1,31 @@
-from datetime import datetime
 from pathlib import Path
 
+import pandas as pd
 
-def simulate_path_logic(docid, submit_date_str):
+
+def simulate_path_logic(docids: pd.Series, submit_dates: pd.Series) -> pd.Series:
     # Mocking basic variables from main.py
     RAW_BASE_DIR = Path("data/raw")
 
-    # parse_datetime mockup
-    submit_date = datetime.strptime(submit_date_str, "%Y-%m-%d %H:%M:%S")
-
-    # save_dir logic from main.py
-    save_dir = (
-        RAW_BASE_DIR
-        / "edinet"
-        / f"year={submit_date.year}"
-        / f"month={submit_date.month:02d}"
-        / f"day={submit_date.day:02d}"
-    )
+    # parse_datetime mockup (列単位で一括パース)
+    submit_date = pd.to_datetime(submit_dates, format="%Y-%m-%d %H:%M:%S")
 
-    raw_zip = save_dir / f"{docid}.zip"
+    # save_dir logic from main.py (パーティション文字列を一括生成)
+    save_dirs = "edinet/" + submit_date.dt.strftime("year=%Y/month=%m/day=%d")
 
     # rel_zip_path logic from main.py (after fix)
     # rel_zip_path = str(raw_zip.relative_to(RAW_BASE_DIR.parent))
     # In main.py: raw_zip.relative_to(RAW_BASE_DIR.parent)
     # RAW_BASE_DIR is data/raw, so parent is data.
     # So raw_zip.relative_to(data) should be raw/edinet/year=...
-
-    rel_path = str(raw_zip.relative_to(RAW_BASE_DIR.parent))
-    return rel_path
+    base = RAW_BASE_DIR.relative_to(RAW_BASE_DIR.parent).as_posix()
+    return base + "/" + save_dirs + "/" + docids + ".zip"
 
 
 if __name__ == "__main__":
-    docid = "S100P91R"
-    date_str = "2022-10-03 09:17:45"
-    result = simulate_path_logic(docid, date_str)
+    docids = pd.Series(["S100P91R"])
+    date_strs = pd.Series(["2022-10-03 09:17:45"])
+    result = simulate_path_logic(docids, date_strs).iloc[0]
     print(f"Index Path: {result}")
     expected = "raw/edinet/year=2022/month=10/day=03/S100P91R.zip"
     assert result == expected, f"Expected {expected}, got {result}"
@@ -6,17 +6,17 @@ def rebuild_history_logic(code, current_master_row, existing_history_df, incomin
     Time-Travel Fix のロジック検証用関数
     """
     # 1. 全情報の集約 (Gathering)
-    timeline = []
+    # 行ごとの追加は行わず、情報源ごとの DataFrame を作成して一度に結合する
+    timeline_cols = ["source", "submit_date", "company_name"]
+    parts = []
 
     # A. 既存履歴からの復元 (Existing History)
     # 履歴イベントの "new_name" は、その時点での状態を表す確実な証拠です。
     if not existing_history_df.empty:
-        for _, h_row in existing_history_df.iterrows():
-            timeline.append(
-                {"source": "history", "submit_date": h_row["change_date"], "company_name": h_row["new_name"]}
-            )
-            # first record's old_name implies the state BEFORE the first change
-            # (Strictly speaking, we don't know WHEN it started, but we know it existed)
+        history = existing_history_df.rename(columns={"change_date": "submit_date", "new_name": "company_name"})
+        parts.append(history.assign(source="history")[timeline_cols])
+        # first record's old_name implies the state BEFORE the first change
+        # (Strictly speaking, we don't know WHEN it started, but we know it existed)
 
     # B. バグ修正: 初回イベントの old_name も「過去のどこか」にある状態として扱いたいが、
     # 日付が不明なため、とりあえず「最古のイベントの直前」として扱うのが安全ではありません。
@@ -25,75 +25,77 @@ def rebuild_history_logic(code, current_master_row, existing_history_df, incomin
 
     initial_name = None
     if not existing_history_df.empty:
-        # 日付順にならんでいる前提、あるいはソート推奨
-        sorted_hist = existing_history_df.sort_values("change_date")
-        if not sorted_hist.empty:
-            initial_name = sorted_hist.iloc[0]["old_name"]
+        # 最古のイベントを 1 パスで特定する (1 要素のために全体をソートしない)
+        dates = existing_history_df["change_date"]
+        idx = dates.idxmin() if dates.notna().any() else existing_history_df.index[0]
+        initial_name = existing_history_df.at[idx, "old_name"]
 
     # C. 現在のマスタ (Current Master)
     # マスタは「最新の状態」または「ある時点の状態」を持っています。
-    if current_master_row and pd.notna(current_master_row.get("last_submitted_at")):
-        timeline.append(
-            {
-                "source": "master",
-                "submit_date": current_master_row["last_submitted_at"],
-                "company_name": current_master_row["company_name"],
-            }
-        )
+    # 参照は一度だけ行い、以降はローカル変数で判定する
+    master_row = current_master_row or {}
+    master_date = master_row.get("last_submitted_at")
+    if pd.notna(master_date):
+        master_name = master_row.get("company_name")
+        parts.append(pd.DataFrame({"source": ["master"], "submit_date": [master_date], "company_name": [master_name]}))
 
     # D. 今回の入力データ (Incoming Data)
-    for row in incoming_rows:
-        if pd.notna(row.get("last_submitted_at")):
-            timeline.append(
-                {"source": "incoming", "submit_date": row["last_submitted_at"], "company_name": row["company_name"]}
-            )
+    if incoming_rows:
+        parts.append(
+            pd.DataFrame(incoming_rows, columns=["last_submitted_at", "company_name"])
+            .dropna(subset=["last_submitted_at"])
+            .rename(columns={"last_submitted_at": "submit_date"})
+            .assign(source="incoming")[timeline_cols]
+        )
 
-    # 2. 時系列ソート (Time Storage)
-    # 日付型に変換してソート
-    for t in timeline:
-        if isinstance(t["submit_date"], str):
-            t["submit_date"] = pd.to_datetime(t["submit_date"])
+    timeline = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=timeline_cols)
 
-    timeline.sort(key=lambda x: x["submit_date"])
+    # 2. 時系列ソート (Time Storage)
+    # 日付型に列単位で一括変換し、同日時は情報源の登録順 (history → master → incoming) を維持してソート
+    # (既存履歴の Timestamp と入力の日付文字列・日時文字列が混在しても、要素ごとの型判定なしに 1 回で変換できる)
+    timeline["submit_date"] = pd.to_datetime(timeline["submit_date"], format="ISO8601", errors="coerce")
+    timeline = timeline.sort_values("submit_date", kind="stable", ignore_index=True)
 
     print(f"--- Timeline for {code} ---")
-    for t in timeline:
-        print(f"  {t['submit_date']}: {t['company_name']} ({t['source']})")
+    for source, submit_date, company_name in timeline[timeline_cols].to_numpy():
+        print(f"  {submit_date}: {company_name} ({source})")
 
     # 3. イベント再定義 (Re-definition)
-    new_history = []
-
-    current_tracking_name = initial_name
+    # 各イベント直前の社名は 1 行前の社名 (先頭は既存履歴から得た初期値) であり、
+    # それと異なる行が社名変更となる
     processed_codes = {code}  # In real logic this is a set of all processed codes
 
-    for event in timeline:
-        event_name = event["company_name"]
-        event_date = event["submit_date"]
-
-        if current_tracking_name is None:
-            current_tracking_name = event_name
-            continue
-
-        if current_tracking_name != event_name:
-            # Change detected
-            new_history.append(
-                {"code": code, "old_name": current_tracking_name, "new_name": event_name, "change_date": event_date}
-            )
-            current_tracking_name = event_name
+    names = timeline["company_name"]
+    prev_names = names.shift(1, fill_value=initial_name)
+    changed = (prev_names.notna() & (prev_names != names)).to_numpy()
+
+    # 列ごとの配列をマスクで一度に切り出して構築する (イベントごとの dict や索引の整列を介さない)
+    new_hist_df = pd.DataFrame(
+        {
+            "code": code,
+            "old_name": prev_names.to_numpy()[changed],
+            "new_name": names.to_numpy()[changed],
+            "change_date": timeline["submit_date"].to_numpy()[changed],
+        }
+    )
 
     # 4. Result Construction (Simulating the Fixed Logic)
     # Logic: Remove old history for processed_codes, then add new history
+    # 結合は呼び出し側で全コード分をまとめて一度だけ行う (コードごとの concat を避ける)
+    filtered_existing = existing_history_df
+    if not filtered_existing.empty:
+        # Filter out this code's old history (処理対象コードとの左結合で、一致しない行のみ残す)
+        processed = pd.DataFrame({"code": list(processed_codes)})
+        merged = filtered_existing.merge(processed, on="code", how="left", indicator=True, validate="many_to_one")
+        filtered_existing = merged[merged["_merge"] == "left_only"].drop(columns="_merge")
 
-    result_df = existing_history_df.copy()
-    if not result_df.empty:
-        # Filter out this code's old history
-        result_df = result_df[~result_df["code"].isin(processed_codes)]
+    return filtered_existing, new_hist_df
 
-    if new_history:
-        new_hist_df = pd.DataFrame(new_history)
-        result_df = pd.concat([result_df, new_hist_df], ignore_index=True)
 
-    return result_df
+def combine_history(existing_parts, new_parts):
+    """rebuild_history_logic の結果 (既存分・新規分) を一括で結合する"""
+    frames = [df for df in existing_parts + new_parts if not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 
 def test_scenario_multiple_changes():
@@ -117,7 +119,8 @@ def test_scenario_multiple_changes():
         {"company_name": "Company A", "last_submitted_at": "2021-01-01"},
     ]
 
-    result = rebuild_history_logic("9999", master_row, existing_history, incoming)
+    existing, new_hist = rebuild_history_logic("9999", master_row, existing_history, incoming)
+    result = combine_history([existing], [new_hist])
     print("\nResult History:")
     print(result)
 
@@ -144,7 +147,8 @@ def test_scenario_future_to_past_bug():
 
     incoming = [{"company_name": "Z Holdings", "last_submitted_at": "2022-04-01"}]
 
-    result = rebuild_history_logic("4689", master_row, existing_history, incoming)
+    existing, new_hist = rebuild_history_logic("4689", master_row, existing_history, incoming)
+    result = combine_history([existing], [new_hist])
     print("\nResult History:")
     print(result)
 
@@ -177,7 +181,8 @@ def test_scenario_no_change_clearing():
 
     incoming = [{"company_name": "Company A", "last_submitted_at": "2022-01-01"}]
 
-    result = rebuild_history_logic(code, master_row, existing_history, incoming)
+    existing, new_hist = rebuild_history_logic(code, master_row, existing_history, incoming)
+    result = combine_history([existing], [new_hist])
 
     print("\nResult History:")
     print(result)
@@ -188,7 +193,32 @@ def test_scenario_no_change_clearing():
     print("✅ Logic Correct: History seed injection successfully preserved past name and shifted change date.")
 
 
+def test_scenario_rerun_with_parsed_history():
+    print("\n=== Test: Re-run on Rebuilt History (Mixed Date Types) ===")
+    # 1 回目の再構築結果 (change_date は datetime64) をそのまま既存履歴として再投入し、
+    # 日付文字列・日時文字列の入力と混在しても同じ時系列で再構築できることを確認する
+    master_row = {"company_name": "Company C", "last_submitted_at": "2023-01-01"}
+    incoming = [
+        {"company_name": "Company B", "last_submitted_at": "2022-01-01"},
+        {"company_name": "Company A", "last_submitted_at": "2021-01-01"},
+    ]
+    _, first_hist = rebuild_history_logic("9999", master_row, pd.DataFrame(), incoming)
+
+    master_row = {"company_name": "Company C", "last_submitted_at": "2023-06-01 09:00:00"}
+    incoming = [{"company_name": "Company B", "last_submitted_at": "2022-06-01"}]
+    existing, new_hist = rebuild_history_logic("9999", master_row, first_hist, incoming)
+    result = combine_history([existing], [new_hist])
+    print("\nResult History:")
+    print(result)
+
+    assert len(result) == 2
+    assert list(result["old_name"]) == ["Company A", "Company B"]
+    assert list(result["change_date"]) == [pd.Timestamp("2022-01-01"), pd.Timestamp("2023-01-01")]
+    print("✅ Logic Correct: Parsed history and raw date strings share one timeline.")
+
+
 if __name__ == "__main__":
     test_scenario_multiple_changes()
     test_scenario_future_to_past_bug()
     test_scenario_no_change_clearing()
+    test_scenario_rerun_with_parsed_history()